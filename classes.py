@@ -8,7 +8,7 @@ The implementation of classes and many methods were borrowed from Exercise 3 whi
 For all additions -> Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
 """
 from __future__ import annotations
-from typing import Any, Union
+from typing import Any, Optional, Union
 import matplotlib.pyplot as plt
 import matplotlib.colors
 import distinctipy
@@ -66,12 +66,28 @@ class _Vertex:
 class Graph:
     """
     A graph used to represent an artist connection network.
+
+    The strength (the degree, or the total edge weight in a WeightedGraph) of every vertex and the total edge
+    weight of the graph are computed once and cached until the graph is changed by add_vertex, add_edge or
+    add_community.
     """
     vertices: dict[Any, _Vertex]
+    # Private Instance Attributes:
+    #   - _strengths: the cached strength of every vertex, keyed by vertex, or None if it must be recomputed
+    #   - _total_weight: the cached total edge weight, or None if it must be recomputed
+    _strengths: Optional[dict[_Vertex, Union[int, float]]]
+    _total_weight: Optional[Union[int, float]]
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges)."""
         self.vertices = {}
+        self._strengths = None
+        self._total_weight = None
+
+    def _invalidate(self) -> None:
+        """Forget the cached strengths and total edge weight, after this graph has changed."""
+        self._strengths = None
+        self._total_weight = None
 
     def add_vertex(self, item: Any) -> None:
         """
@@ -82,6 +98,7 @@ class Graph:
         """
         if item not in self.vertices:
             self.vertices[item] = _Vertex(item)
+            self._invalidate()
 
     def add_edge(self, item1: Any, item2: Any) -> None:
         """
@@ -98,6 +115,7 @@ class Graph:
 
             v1.neighbours.add(v2)
             v2.neighbours.add(v1)
+            self._invalidate()
         else:
             raise ValueError
 
@@ -221,9 +239,11 @@ class Graph:
         Return a list of all the communites with its members in dictionaries with the item
         as the key and the _Vertex object as the value.
 
+        The list is in increasing order of community id, and the members of each community are in the
+        order of communities, so communities does not need to be sorted.
+
         Preconditions:
             - all(community[v] in self.vertices for v in community)
-            - list(communites.values()) == sorted(communites.values())
 
         >>> communities_dict = {1: 0, 2: 0, 3: 0, 4: 1, 5: 2}
         >>> g = WeightedGraph()
@@ -232,53 +252,76 @@ class Graph:
         >>> lst = g.make_community_dicts(communities_dict)
         >>> lst == [{1: g.vertices[1], 2: g.vertices[2], 3: g.vertices[3]}, {4: g.vertices[4]}, {5: g.vertices[5]}]
         True
+        >>> lst = g.make_community_dicts({1: 1, 2: 0, 3: 1, 4: 0, 5: 2})
+        >>> lst == [{2: g.vertices[2], 4: g.vertices[4]}, {1: g.vertices[1], 3: g.vertices[3]}, {5: g.vertices[5]}]
+        True
         """
-        community_ids = list(set(communities.values()))
-        curr_id = community_ids[0]
-        dict_lst = []
-        community_dict = {}
+        community_dicts = {}
 
         for v in communities:
-            if communities[v] != curr_id:
-                curr_id = communities[v]
-                dict_lst.append(community_dict)
-                community_dict = {}
-
-            if communities[v] == curr_id:
-                community_dict[v] = self.vertices[v]
-
-        dict_lst.append(community_dict)
+            if communities[v] not in community_dicts:
+                community_dicts[communities[v]] = {}
+            community_dicts[communities[v]][v] = self.vertices[v]
 
-        return dict_lst
+        return [community_dicts[c] for c in sorted(community_dicts)]
 
     def to_networkx(self) -> nx.Graph:
         """
         Convert this graph into a networkx Graph.
+
+        The nodes are the items of the vertices (which may have been changed since they were added, e.g. to
+        the restaurant names), added in the order of self.vertices, and every edge is added once, all in bulk.
         Credit: this function is adapted from exercise 4 of CSC111, with some changes.
+
+        >>> g = Graph()
+        >>> for i in range(1, 4):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2)
+        >>> g.add_edge(2, 3)
+        >>> graph_nx = g.to_networkx()
+        >>> list(graph_nx.nodes), graph_nx.number_of_edges()
+        ([1, 2, 3], 2)
+        >>> for i in g.vertices:
+        ...     g.vertices[i].item = 'v' + str(i)
+        >>> graph_nx = g.to_networkx()
+        >>> list(graph_nx.nodes), sorted(graph_nx.edges)
+        (['v1', 'v2', 'v3'], [('v1', 'v2'), ('v2', 'v3')])
         """
         graph_nx = nx.Graph()
-        for v in self.vertices.values():
-            graph_nx.add_node(v.item)
+        graph_nx.add_nodes_from(v.item for v in self.vertices.values())
+        graph_nx.add_edges_from((u.item, v.item) for u, v, _ in self._edges())
 
+        return graph_nx
+
+    def _edges(self) -> list[tuple[_Vertex, _Vertex, Union[int, float]]]:
+        """Return every edge of this graph once, as its two endpoints and its weight."""
+        edges = []
+        visited = set()
+        for v in self.vertices.values():
             for u in v.neighbours:
-                graph_nx.add_node(u.item)
+                if u.item not in visited:
+                    edges.append((v, u, self._edge_weight(v, u)))
+            visited.add(v.item)
 
-                if u.item in graph_nx.nodes:
-                    graph_nx.add_edge(v.item, u.item)
+        return edges
 
-        return graph_nx
+    def _edge_weight(self, v: _Vertex, u: _Vertex) -> Union[int, float]:
+        """Return the weight of the edge between the adjacent vertices v and u."""
+        return 1
 
-    def make_community_graph(self, communities: dict[str: int], length: int) -> None:
+    def make_community_graph(self, communities: dict[str: int], length: int, seed: int = 0) -> None:
         """
         Outputs a graph of the network, colour-coding the communities and labelling vertices.
+
+        The colours are generated from seed, so the same communities get the same colours on every run.
         """
         g = self.to_networkx()
         pos = nx.circular_layout(g)
         plt.figure(figsize=(10, 10))
         plt.axis('off')
-        colours = matplotlib.colors.ListedColormap(distinctipy.get_colors(length))
-        nx.draw_networkx_nodes(g, pos, node_size=200, cmap=colours,
-                               node_color=list(communities.values()))
+        colours = matplotlib.colors.ListedColormap(distinctipy.get_colors(length, rng=seed))
+        nx.draw_networkx_nodes(g, pos, node_size=200, cmap=colours, vmin=0, vmax=max(length - 1, 1),
+                               node_color=[communities[node] for node in g.nodes])
         nx.draw_networkx_edges(g, pos, alpha=0.3)
         nx.draw_networkx_labels(g, pos, font_size=6)
         plt.show()
@@ -309,6 +352,82 @@ class Graph:
         # since undirected graph
         return int(total_degree / 2)
 
+    def get_total_weight(self) -> Union[int, float]:
+        """
+        Return the total weight of the edges in this graph (the number of edges when they are unweighted).
+
+        The total weight is an int when every edge weight is an int, and the exact float otherwise.
+
+        >>> g = WeightedGraph()
+        >>> for i in range(1, 4):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2, 0.5)
+        >>> g.get_total_weight()
+        0.5
+        >>> g.add_edge(2, 3, 1.5)
+        >>> g.get_total_weight()
+        2.0
+        """
+        if self._total_weight is None:
+            # since undirected graph, every edge weight is in the strengths of both of its vertices
+            total_strength = sum(self.get_strengths().values())
+            if isinstance(total_strength, int):
+                self._total_weight = total_strength // 2
+            else:
+                self._total_weight = total_strength / 2
+
+        return self._total_weight
+
+    def get_strengths(self) -> dict[_Vertex, Union[int, float]]:
+        """
+        Return a dictionary mapping every vertex to its strength, the sum of the weights of its edges (its
+        degree when the edges are unweighted).
+
+        The dictionary is keyed by the vertices themselves rather than their items, so it stays correct after
+        the items are changed (e.g. to the restaurant names in main.py). It is cached, so it must not be
+        modified.
+
+        >>> g = Graph()
+        >>> for i in range(1, 4):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2)
+        >>> [g.get_strengths()[g.vertices[i]] for i in range(1, 4)]
+        [1, 1, 0]
+        >>> g.add_edge(2, 3)
+        >>> [g.get_strengths()[g.vertices[i]] for i in range(1, 4)]
+        [1, 2, 1]
+        """
+        if self._strengths is None:
+            self._strengths = {v: self._vertex_strength(v) for v in self.vertices.values()}
+
+        return self._strengths
+
+    def get_community_strengths(self, communities: dict[_Vertex, int]) -> dict[int, Union[int, float]]:
+        """
+        Return a dictionary mapping every community to the total strength of its vertices.
+
+        Preconditions:
+            - all(v in communities for v in self.vertices.values())
+
+        >>> g = Graph()
+        >>> for i in range(1, 4):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2)
+        >>> g.add_edge(2, 3)
+        >>> g.get_community_strengths({g.vertices[1]: 0, g.vertices[2]: 0, g.vertices[3]: 1})
+        {0: 3, 1: 1}
+        """
+        strengths = self.get_strengths()
+        totals = {}
+        for v in self.vertices.values():
+            totals[communities[v]] = totals.get(communities[v], 0) + strengths[v]
+
+        return totals
+
+    def _vertex_strength(self, v: _Vertex) -> Union[int, float]:
+        """Return the strength of vertex v, computed from its neighbours."""
+        return len(v.neighbours)
+
     def calculate_modularity_each(self, v: _Vertex, communities: dict[_Vertex, int],
                                   adjacency_matrix: dict[int, dict[int, int]], m: int) -> float:
         """
@@ -316,37 +435,61 @@ class Graph:
 
         Preconditions:
             - m != 0
+            - adjacency_matrix is the adjacency matrix of this graph
         """
-        k_v = len(v.neighbours)
-        total_sum = 0
+        return self._modularity_each(v, communities, adjacency_matrix, m, self.get_community_strengths(communities))
 
-        for u in self.vertices.values():
-            if communities[v] == communities[u]:
-                delta = 1
-            else:
-                delta = 0
-            k_u = len(u.neighbours)
+    def _modularity_each(self, v: _Vertex, communities: dict[_Vertex, int],
+                         adjacency_matrix: dict[int, dict[int, int]], m: int,
+                         community_strengths: dict[int, Union[int, float]]) -> float:
+        """
+        Return calculate_modularity_each(v, communities, adjacency_matrix, m), given the total strength of
+        every community.
 
-            adjacent_score = adjacency_matrix[v.item][u.item]
+        This is the sum over every other vertex u in the community of v of (A_vu - k_u * k_v / 2m). Only the
+        neighbours of v can have A_vu != 0, and the k_u of the other vertices add up to the total strength of
+        the community minus k_v, so this takes time proportional to the degree of v.
 
-            if adjacent_score != -1 and u != v:
-                adjacent = (adjacent_score - (k_u * k_v) / (2 * m)) * delta
-                total_sum += adjacent
+        Preconditions:
+            - m != 0
+            - adjacency_matrix is the adjacency matrix of this graph
+        """
+        community = communities[v]
+        k_v = self.get_strengths()[v]
+        inner = 0
+        for u in v.neighbours:
+            if communities[u] == community:
+                inner += adjacency_matrix[v.item][u.item]
 
-        return total_sum
+        # kept as one fraction, so it is exact when the weights are integers
+        return (2 * m * inner - k_v * (community_strengths[community] - k_v)) / (2 * m)
 
     def calculate_modularity_graph(self, communities: dict[_Vertex, int],
                                    adjacency_matrix: dict[int, dict[int, int]]) -> float:
         """
         Return the modularity score of the graph based on current communities.
-        """
-        m = self.get_num_edges()
+
+        >>> g = Graph()
+        >>> for i in range(1, 5):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2)
+        >>> g.add_edge(3, 4)
+        >>> g.add_edge(2, 3)
+        >>> c = {g.vertices[1]: 0, g.vertices[2]: 0, g.vertices[3]: 1, g.vertices[4]: 1}
+        >>> round(g.calculate_modularity_graph(c, g.make_adjacent_matrix()), 4)
+        0.4444
+        >>> for i in g.vertices:
+        ...     g.vertices[i].item = 'n' + str(i)
+        >>> round(g.calculate_modularity_graph(c, g.make_adjacent_matrix()), 4)
+        0.4444
+        """
+        m = self.get_total_weight()
         curr_modularity = 0
 
         if m > 0:
+            community_strengths = self.get_community_strengths(communities)
             for v in self.vertices.values():
-                curr_modularity += self.calculate_modularity_each(v, communities,
-                                                                  adjacency_matrix, m)
+                curr_modularity += self._modularity_each(v, communities, adjacency_matrix, m, community_strengths)
 
             return curr_modularity / (2 * m)
         else:
@@ -454,6 +597,7 @@ class WeightedGraph(Graph):
         """
         if item not in self.vertices:
             self.vertices[item] = _WeightedVertex(item)
+            self._invalidate()
 
     def add_community(self, item: Any, weight: int, members: dict[int: _Vertex]) -> None:
         """
@@ -464,6 +608,7 @@ class WeightedGraph(Graph):
         """
         if item not in self.vertices:
             self.vertices[item] = _Community(item, weight, members)
+            self._invalidate()
 
     def add_edge(self, item1: Any, item2: Any, weight: Union[int, float] = 1) -> None:
         """
@@ -482,6 +627,7 @@ class WeightedGraph(Graph):
 
             v1.neighbours[v2] = weight
             v2.neighbours[v1] = weight
+            self._invalidate()
         else:
             raise ValueError
 
@@ -541,28 +687,73 @@ class WeightedGraph(Graph):
 
     def to_networkx(self) -> nx.Graph:
         """
-        Convert this graph into a networkx Graph.
+        Convert this graph into a networkx Graph, keeping the edge weights as the 'weight' edge attribute.
+
+        The nodes of communities have the members and inner_weight of the _Community as node attributes, so
+        from_networkx can rebuild them. The nodes and edges are added in bulk, every edge once.
         Credit: this function is adapted from exercise 4 of CSC111, with some changes.
+
+        >>> g = WeightedGraph()
+        >>> for i in range(1, 3):
+        ...     g.add_vertex(i)
+        >>> g.add_community(3, 1, {1: g.vertices[1], 2: g.vertices[2]})
+        >>> g.add_edge(1, 2, 4)
+        >>> graph_nx = g.to_networkx()
+        >>> graph_nx[1][2]['weight'], list(graph_nx.nodes[3]['members'])
+        (4, [1, 2])
+        >>> g.vertices[1].item = 'one'
+        >>> sorted(g.to_networkx().edges(data='weight'), key=str)
+        [('one', 2, 4)]
         """
         graph_nx = nx.Graph()
-        for v in self.vertices.values():
-            graph_nx.add_node(v.item)
+        graph_nx.add_nodes_from((v.item, _node_attributes(v)) for v in self.vertices.values())
+        graph_nx.add_weighted_edges_from((u.item, v.item, weight) for u, v, weight in self._edges())
 
-            for u in v.neighbours:
-                graph_nx.add_node(u.item)
+        return graph_nx
 
-                if u.item in graph_nx.nodes:
-                    graph_nx.add_edge(v.item, u.item)
+    @classmethod
+    def from_networkx(cls, graph_nx: nx.Graph, weight: str = 'weight') -> WeightedGraph:
+        """
+        Return the weighted graph with the nodes and edges of graph_nx, the inverse of to_networkx.
 
-        return graph_nx
+        A node with a 'members' attribute becomes a _Community, with the inner weight in its 'inner_weight'
+        attribute. An edge without the weight attribute gets weight 1, and self-loops are left out.
+
+        >>> g = WeightedGraph()
+        >>> for i in range(1, 3):
+        ...     g.add_vertex(i)
+        >>> g.add_community(3, 1, {1: g.vertices[1], 2: g.vertices[2]})
+        >>> g.add_edge(1, 2, 4)
+        >>> g.add_edge(2, 3, 1)
+        >>> new_g = WeightedGraph.from_networkx(g.to_networkx())
+        >>> new_g.get_weight(1, 2), new_g.vertices[3].inner_weight, new_g.get_all_edge_weights()
+        (4, 2, 5)
+        """
+        new_graph = cls()
+        for item, attributes in graph_nx.nodes(data=True):
+            if 'members' in attributes:
+                new_graph.add_community(item, attributes.get('inner_weight', 0) // 2, attributes['members'])
+            else:
+                new_graph.add_vertex(item)
+
+        for item1, item2, edge_weight in graph_nx.edges(data=weight, default=1):
+            if item1 != item2:
+                new_graph.add_edge(item1, item2, edge_weight)
+
+        return new_graph
+
+    def _edge_weight(self, v: _WeightedVertex, u: _WeightedVertex) -> Union[int, float]:
+        """Return the weight of the edge between the adjacent vertices v and u."""
+        return v.neighbours[u]
 
     def make_community_dicts(self, communities: dict[int, int]) -> list[dict[int, _Vertex]]:
         """
         Return a list of all the communities with its memebers in separate dictionaries with the
         item as the key and the _vertex object as the value
 
+        The list is in increasing order of community id, so communities does not need to be sorted.
+
         Preconditons:
-        - list(communites.values()) == sorted(communites.values())
         - all(community[v] in self.vertices for v in community)
 
 
@@ -574,23 +765,14 @@ class WeightedGraph(Graph):
         >>> lst == [{1: g.vertices[1], 2: g.vertices[2], 3: g.vertices[3]}, {4: g.vertices[4]}, {5: g.vertices[5]}]
         True
         """
-        community_ids = list(set(communities.values()))
-        curr_id = community_ids[0]
-        dict_lst = []
-        community_dict = {}
+        community_dicts = {}
 
         for v in communities:
-            if communities[v] != curr_id:
-                curr_id = communities[v]
-                dict_lst.append(community_dict)
-                community_dict = {}
-
-            if communities[v] == curr_id:
-                community_dict[v] = self.vertices[v]
+            if communities[v] not in community_dicts:
+                community_dicts[communities[v]] = {}
+            community_dicts[communities[v]][v] = self.vertices[v]
 
-        dict_lst.append(community_dict)
-
-        return dict_lst
+        return [community_dicts[c] for c in sorted(community_dicts)]
 
     def make_adjacent_matrix(self) -> dict[int, dict[int, int]]:
         """
@@ -609,67 +791,37 @@ class WeightedGraph(Graph):
 
         return matrix
 
-    def get_all_edge_weights(self) -> int:
+    def get_all_edge_weights(self) -> Union[int, float]:
         """
         Return the sum of all edge weights in the graph.
 
         Preconditions:
             - len(self.vertices) > 1
             - at least 1 edge exist in the graph
-        """
-        all_edge_weights = 0
-
-        for v in self.vertices.values():
-            all_edge_weights += sum(list(v.neighbours.values()))
-
-        return int(all_edge_weights / 2)
-
-    def calculate_modularity_each(self, v: _WeightedVertex, communities: dict[_Vertex, int],
-                                  adjacency_matrix: dict[int, dict[int, int]], m: int) -> float:
-        """
-        Return the modularity of the current partitioning of communities in graph
-
-        Preconditions:
-            - m != 0
-        """
-        k_v = sum(list(v.neighbours.values()))
-        total_sum = 0
-
-        for u in self.vertices.values():
-            if communities[v] == communities[u]:
-                delta = 1
-            else:
-                delta = 0
-            k_u = sum(list(u.neighbours.values()))
 
-            adjacent_score = adjacency_matrix[v.item][u.item]
-
-            if adjacent_score != -1 and u != v:
-                adjacent = (adjacent_score - (k_u * k_v) / (2 * m)) * delta
-                total_sum += adjacent
-        return total_sum
-
-    def calculate_modularity_graph(self, communities: dict[_Vertex, int],
-                                   adjacency_matrix: dict[int, dict[int, int]]) -> float:
+        >>> g = WeightedGraph()
+        >>> for i in range(1, 4):
+        ...     g.add_vertex(i)
+        >>> g.add_edge(1, 2, 3)
+        >>> g.get_all_edge_weights()
+        3
+        >>> g.add_edge(2, 3, 2)
+        >>> g.get_all_edge_weights()
+        5
         """
-        Return the modularity score of the graph based on current communities.
+        return self.get_total_weight()
 
-        Preconditions:
-            - len(self.vertices) > 1
-            - self.get_num_edges() > 0
-        """
-        m = self.get_all_edge_weights()
-        curr_modularity = 0
+    def _vertex_strength(self, v: _WeightedVertex) -> Union[int, float]:
+        """Return the strength of vertex v, the sum of the weights of its edges."""
+        return sum(v.neighbours.values())
 
-        if m > 0:
-            for v in self.vertices.values():
-                curr_modularity += self.calculate_modularity_each(v, communities,
-                                                                  adjacency_matrix, m)
 
-            return curr_modularity / (2 * m)
-        else:
-            # return 0 when there's no edges between graphs
-            return 0
+def _node_attributes(v: _WeightedVertex) -> dict[str, Any]:
+    """Return the networkx node attributes of v: the members and inner weight of a community, none otherwise."""
+    if isinstance(v, _Community):
+        return {'members': v.members, 'inner_weight': v.inner_weight}
+    else:
+        return {}
 
 
 if __name__ == '__main__':
@@ -680,7 +832,7 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'extra-imports': ['networkx', 'matplotlib.pyplot', 'matplotlib.colors',
-                          'distinctipy', 'Any', 'Union', 'annotations'],
+                          'distinctipy', 'Any', 'Optional', 'Union', 'annotations'],
         'allowed-io': [],
         'max-line-length': 120,
         'max-nested-blocks': 4
@@ -0,0 +1,175 @@
+"""
+This module contains the compact, array based graph used by the fast community detection path.
+
+Unlike Graph and WeightedGraph in classes.py, a CompactGraph does not create one Python object per vertex or
+edge. Vertices are numbered 0 to n - 1, the original items are kept in one array, and the edges are kept as
+canonical (src, dst, weights) arrays together with a CSR (compressed sparse row) adjacency built from them.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from typing import Any, Optional
+import numpy as np
+from edge_ingest import canonical_edges, pair_order
+
+
+class CompactGraph:
+    """
+    A weighted, optionally directed graph stored in NumPy arrays.
+
+    For an undirected graph every edge is stored once in src/dst with src <= dst, and appears in both rows of
+    the CSR adjacency (a self-loop appears once). For a directed graph the CSR adjacency holds the out-edges
+    and in_indptr/in_indices/in_data hold the in-edges.
+
+    Instance Attributes:
+        - items: items[i] is the original item (e.g. the node id in the dataset) of vertex i
+        - directed: whether the edges are directed
+        - src, dst, weights: the canonical edge arrays, using vertex indices
+        - indptr, indices, data: the CSR adjacency, the neighbours of i are indices[indptr[i]:indptr[i + 1]]
+        - in_indptr, in_indices, in_data: the CSR in-adjacency (the same arrays as above when undirected)
+        - out_strength: the total weight of the edges leaving each vertex, a self-loop counted twice when
+        undirected
+        - in_strength: the total weight of the edges entering each vertex (equal to out_strength when
+        undirected)
+        - total_weight: the sum of all edge weights, m in the modularity formula
+
+    Representation Invariants:
+        - self.items.shape[0] == self.indptr.shape[0] - 1
+        - self.directed or all(self.src <= self.dst)
+    """
+    items: np.ndarray
+    directed: bool
+    src: np.ndarray
+    dst: np.ndarray
+    weights: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    in_indptr: np.ndarray
+    in_indices: np.ndarray
+    in_data: np.ndarray
+    out_strength: np.ndarray
+    in_strength: np.ndarray
+    total_weight: float
+
+    def __init__(self, num_vertices: int, src: np.ndarray, dst: np.ndarray, weights: Optional[np.ndarray] = None,
+                 directed: bool = False, items: Optional[np.ndarray] = None) -> None:
+        """
+        Initialize a compact graph with vertices 0 to num_vertices - 1 and the given edges.
+
+        The edges are passed through canonical_edges, so repeated edges are merged into their total weight
+        and self-loops are kept.
+
+        Preconditions:
+            - all(0 <= v < num_vertices for v in src) and all(0 <= v < num_vertices for v in dst)
+            - items is None or len(items) == num_vertices
+
+        >>> g = CompactGraph(3, np.array([0, 1, 1]), np.array([1, 2, 0]))
+        >>> g.src.tolist(), g.dst.tolist(), g.weights.tolist()
+        ([0, 1], [1, 2], [2, 1])
+        >>> g.out_strength.tolist(), g.total_weight
+        ([2.0, 3.0, 1.0], 3.0)
+        >>> g.neighbours(1)[0].tolist()
+        [0, 2]
+        """
+        self.directed = directed
+        if items is None:
+            items = np.arange(num_vertices, dtype=np.int64)
+        self.items = np.asarray(items)
+
+        self.src, self.dst, self.weights = canonical_edges(src, dst, weights, accumulate=True,
+                                                           self_loops='keep', directed=directed)
+        weights_f = self.weights.astype(np.float64)
+        self.total_weight = float(weights_f.sum())
+
+        self.out_strength = np.bincount(self.src, weights=weights_f, minlength=num_vertices)
+        self.in_strength = np.bincount(self.dst, weights=weights_f, minlength=num_vertices)
+
+        if directed:
+            self.indptr, self.indices, self.data = _to_csr(num_vertices, self.src, self.dst, self.weights)
+            self.in_indptr, self.in_indices, self.in_data = _to_csr(num_vertices, self.dst, self.src,
+                                                                    self.weights)
+        else:
+            self.out_strength = self.out_strength + self.in_strength
+            self.in_strength = self.out_strength
+            loops = self.src == self.dst
+            rows = np.concatenate((self.src, self.dst[~loops]))
+            cols = np.concatenate((self.dst, self.src[~loops]))
+            self.indptr, self.indices, self.data = _to_csr(num_vertices, rows, cols,
+                                                           np.concatenate((self.weights, self.weights[~loops])))
+            self.in_indptr, self.in_indices, self.in_data = self.indptr, self.indices, self.data
+
+    @classmethod
+    def from_item_edges(cls, items: np.ndarray, src_items: np.ndarray, dst_items: np.ndarray,
+                        weights: Optional[np.ndarray] = None, directed: bool = False) -> CompactGraph:
+        """
+        Return the compact graph over the given items, with edges given by the items at their endpoints.
+
+        Vertex i of the returned graph is items[i].
+
+        Preconditions:
+            - len(set(items)) == len(items)
+            - all(u in items for u in src_items) and all(v in items for v in dst_items)
+
+        >>> g = CompactGraph.from_item_edges(np.array([30, 10, 20]), np.array([10, 20]), np.array([30, 30]))
+        >>> g.src.tolist(), g.dst.tolist()
+        ([0, 0], [1, 2])
+        """
+        items = np.asarray(items)
+        order = np.argsort(items, kind='stable')
+        sorted_items = items[order]
+        src = order[np.searchsorted(sorted_items, src_items)]
+        dst = order[np.searchsorted(sorted_items, dst_items)]
+
+        return cls(items.shape[0], src, dst, weights, directed, items)
+
+    @property
+    def num_vertices(self) -> int:
+        """Return the number of vertices in this graph."""
+        return self.indptr.shape[0] - 1
+
+    @property
+    def num_edges(self) -> int:
+        """Return the number of distinct edges in this graph."""
+        return self.src.shape[0]
+
+    def neighbours(self, v: int) -> (np.ndarray, np.ndarray):
+        """
+        Return the (out-)neighbours of vertex v and the weights of the edges to them.
+
+        The returned arrays are views into the CSR adjacency, not copies.
+        """
+        start, end = self.indptr[v], self.indptr[v + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def item_of(self, v: int) -> Any:
+        """Return the original item of vertex v."""
+        return self.items[v].item()
+
+
+def _to_csr(num_vertices: int, rows: np.ndarray, cols: np.ndarray,
+            values: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Return the (indptr, indices, data) CSR arrays of the given coordinate entries, with each row's columns in
+    increasing order.
+    """
+    order = pair_order(rows, cols)
+    counts = np.bincount(rows, minlength=num_vertices)
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    return indptr, cols[order].astype(np.int64), values[order]
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['numpy', 'edge_ingest', 'Any', 'Optional', 'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,411 @@
+"""
+This module contains the Louvain algorithm on the compact, array based graph in compact_graph.py.
+
+Modularity is computed from the canonical edge arrays in one vectorized pass. For undirected graphs it is
+the usual definition
+
+    Q = sum over communities c of (L_c / m - resolution * (K_c / 2m) ** 2)
+
+and for directed graphs the Leicht-Newman definition
+
+    Q = sum over communities c of (L_c / m - resolution * K_c_out * K_c_in / m ** 2)
+
+where m is the total edge weight, L_c the weight of the edges inside c and K_c the total strength (out/in
+strength when directed) of the vertices in c. Aggregating a level keeps Q unchanged, since the edges inside
+a community become a self-loop of the new community vertex.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from typing import Optional
+import time
+import numpy as np
+from compact_graph import CompactGraph
+
+
+def modularity(graph: CompactGraph, labels: np.ndarray, resolution: float = 1.0) -> float:
+    """
+    Return the modularity of the partition of graph where vertex i is in community labels[i].
+
+    Preconditions:
+        - len(labels) == graph.num_vertices
+        - all(label >= 0 for label in labels)
+
+    >>> g = CompactGraph(4, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> modularity(g, np.array([0, 0, 0, 1]))
+    -0.03125
+    >>> modularity(g, np.array([0, 0, 1, 1]))
+    0.0
+    """
+    m = graph.total_weight
+    if m == 0:
+        return 0.0
+
+    labels = np.asarray(labels)
+    num_labels = int(labels.max()) + 1
+    same = labels[graph.src] == labels[graph.dst]
+    internal = float(graph.weights[same].sum())
+    out_total = np.bincount(labels, weights=graph.out_strength, minlength=num_labels)
+
+    if graph.directed:
+        in_total = np.bincount(labels, weights=graph.in_strength, minlength=num_labels)
+        return internal / m - resolution * float(out_total @ in_total) / (m * m)
+
+    return internal / m - resolution * float(out_total @ out_total) / (4 * m * m)
+
+
+def local_move(graph: CompactGraph, labels: np.ndarray, resolution: float = 1.0,
+               max_sweeps: int = 100) -> (np.ndarray, int):
+    """
+    Return the labels after moving single vertices to the neighbouring community with the best modularity gain,
+    together with the number of moves made.
+
+    Vertices are swept in increasing order until a sweep makes no move or max_sweeps sweeps have been made.
+
+    Preconditions:
+        - len(labels) == graph.num_vertices
+        - all(0 <= label < graph.num_vertices for label in labels)
+
+    >>> g = CompactGraph(6, np.array([0, 0, 1, 3, 3, 4, 2]), np.array([1, 2, 2, 4, 5, 5, 3]))
+    >>> new_labels, moves = local_move(g, np.arange(6))
+    >>> new_labels.tolist()
+    [1, 1, 1, 5, 5, 5]
+    """
+    labels, moves, _, _ = _move_vertices(graph, labels, resolution, max_sweeps)
+
+    return labels, moves
+
+
+def _move_vertices(graph: CompactGraph, labels: np.ndarray, resolution: float, max_sweeps: int,
+                   deadline: Optional[float] = None) -> (np.ndarray, int, int, bool):
+    """
+    Run the sweeps of local_move and return the new labels, the number of moves, the number of sweeps made and
+    whether the labels converged (a sweep made no move).
+
+    If deadline is not None, no new sweep is started once time.monotonic() has reached it, so the labels are
+    always those at the end of a whole sweep.
+    """
+    labels = np.array(labels, dtype=np.int64)
+    m = graph.total_weight
+    if m == 0:
+        return labels, 0, 0, True
+
+    n = graph.num_vertices
+    lab = labels.tolist()
+    k_out = graph.out_strength.tolist()
+    k_in = graph.in_strength.tolist()
+    tot_out = np.bincount(labels, weights=graph.out_strength, minlength=n).tolist()
+    tot_in = np.bincount(labels, weights=graph.in_strength, minlength=n).tolist() if graph.directed else tot_out
+    adjacency = [(graph.indptr.tolist(), graph.indices.tolist(), graph.data.tolist())]
+    if graph.directed:
+        adjacency.append((graph.in_indptr.tolist(), graph.in_indices.tolist(), graph.in_data.tolist()))
+
+    moves = 0
+    sweeps = 0
+    moved = True
+    while moved and sweeps < max_sweeps:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        moved = False
+        sweeps += 1
+        for v in range(n):
+            links = community_links(v, lab, adjacency)
+            best = best_community(v, lab[v], links, k_out[v], k_in[v], tot_out, tot_in, m, resolution,
+                                   graph.directed)
+            if best != lab[v]:
+                lab[v] = best
+                moves += 1
+                moved = True
+
+    return np.array(lab, dtype=np.int64), moves, sweeps, not moved
+
+
+def community_links(v: int, lab: list[int], adjacency: list[tuple[list, list, list]],
+                     offset: int = 0) -> dict[int, float]:
+    """
+    Return a dictionary mapping each community next to v to the weight of the edges between v and it, leaving
+    out self-loops.
+
+    lab[u] is the community of vertex u, and adjacency holds the (indptr, indices, data) CSR arrays of graph
+    as lists (the out- and in-adjacency of a directed graph). offset is the first vertex covered by the given
+    adjacency, so that the row of v is v - offset.
+
+    >>> community_links(1, [0, 0, 2], [([0, 1, 3, 4], [1, 0, 2, 1], [1.0, 1.0, 2.0, 2.0])])
+    {0: 1.0, 2: 2.0}
+    """
+    links = {}
+    row = v - offset
+    for indptr, indices, data in adjacency:
+        for p in range(indptr[row], indptr[row + 1]):
+            u = indices[p]
+            if u != v:
+                links[lab[u]] = links.get(lab[u], 0.0) + data[p]
+
+    return links
+
+
+def best_community(v: int, current: int, links: dict[int, float], k_out: float, k_in: float,
+                    tot_out: list[float], tot_in: list[float], m: float, resolution: float,
+                    directed: bool) -> int:
+    """
+    Remove v from its current community, then return the community with the highest modularity gain for v
+    and add v to it, updating tot_out and tot_in.
+
+    links is community_links of v, k_out and k_in are the out- and in-strength of v (the same value for an
+    undirected graph, where tot_in is tot_out), and m is the total edge weight. Ties keep v in its current
+    community, so that a vertex only moves for a strict gain.
+
+    >>> tot = [2.0, 3.0, 4.0]
+    >>> best_community(1, 1, {0: 1.0, 2: 2.0}, 3.0, 3.0, tot, tot, 4.5, 1.0, False), tot
+    (2, [2.0, 0.0, 7.0])
+    """
+    tot_out[current] -= k_out
+    if directed:
+        tot_in[current] -= k_in
+
+    def gain(community: int, weight: float) -> float:
+        if directed:
+            return weight / m - resolution * (k_out * tot_in[community] + k_in * tot_out[community]) / (m * m)
+        return weight / m - resolution * k_out * tot_out[community] / (2 * m * m)
+
+    best, best_gain = current, gain(current, links.get(current, 0.0))
+    for community, weight in links.items():
+        community_gain = gain(community, weight)
+        if community_gain > best_gain:
+            best, best_gain = community, community_gain
+
+    tot_out[best] += k_out
+    if directed:
+        tot_in[best] += k_in
+
+    return best
+
+
+def canonical_labels(labels: np.ndarray) -> np.ndarray:
+    """
+    Return the partition given by labels renumbered canonically: community ids are 0 to k - 1, in increasing
+    order of the smallest vertex in each community.
+
+    Two runs that find the same partition therefore return identical arrays, whatever ids they used
+    internally.
+
+    >>> canonical_labels(np.array([7, 3, 7, 9, 3])).tolist()
+    [0, 1, 0, 2, 1]
+    """
+    unique, first, inverse = np.unique(np.asarray(labels), return_index=True, return_inverse=True)
+    rank = np.empty(unique.shape[0], dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(unique.shape[0])
+
+    return rank[inverse.reshape(-1)]
+
+
+def aggregate(graph: CompactGraph, labels: np.ndarray) -> CompactGraph:
+    """
+    Return the graph with one vertex per community, where the weight of the edge between two communities is
+    the total weight of the edges between their members and the edges inside a community become a self-loop.
+
+    Preconditions:
+        - labels are the contiguous community ids 0 to k - 1 of the vertices of graph
+
+    >>> g = CompactGraph(4, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> coarse = aggregate(g, np.array([0, 0, 0, 1]))
+    >>> coarse.src.tolist(), coarse.dst.tolist(), coarse.weights.tolist()
+    ([0, 0], [0, 1], [3, 1])
+    """
+    labels = np.asarray(labels)
+    num_communities = int(labels.max()) + 1 if labels.shape[0] else 0
+
+    return CompactGraph(num_communities, labels[graph.src], labels[graph.dst], graph.weights, graph.directed)
+
+
+def louvain(graph: CompactGraph, resolution: float = 1.0, min_gain: float = 1e-7,
+            initial_labels: Optional[np.ndarray] = None) -> (list[np.ndarray], float):
+    """
+    Run the Louvain algorithm on graph, alternating local moving and aggregation until a level no longer
+    merges communities or improves modularity by more than min_gain.
+
+    Return the list of levels and the final modularity, where levels[k][i] is the community of vertex i of
+    graph after level k. If initial_labels is given, it is used as the starting partition of the first level.
+
+    Vertices are always swept in increasing order and every level is numbered by canonical_labels, so the
+    result only depends on graph and its arguments.
+
+    Preconditions:
+        - graph.num_vertices > 0
+        - initial_labels is None or len(initial_labels) == graph.num_vertices
+
+    >>> g = CompactGraph(6, np.array([0, 0, 1, 3, 3, 4, 2]), np.array([1, 2, 2, 4, 5, 5, 3]))
+    >>> levels, q = louvain(g)
+    >>> levels[-1].tolist(), round(q, 4)
+    ([0, 0, 0, 1, 1, 1], 0.3571)
+    """
+    run = LouvainRun(graph, resolution, min_gain, initial_labels)
+    run.run()
+
+    return run.levels, run.modularity
+
+
+class LouvainRun:
+    """
+    A run of the Louvain algorithm that can be stopped when a time budget runs out and resumed later.
+
+    Each call to run continues from where the previous call stopped. The time budget is checked before every
+    sweep of the local moving phase and before every level, so a call returns at most one sweep after its
+    budget is spent, with the best partition found so far. A stopped run keeps all of its state in this
+    object (which can be pickled), and a run that is never stopped gives the same result as louvain.
+
+    Instance Attributes:
+        - graph: the graph the communities are detected in
+        - resolution: the resolution of the modularity that is optimized
+        - min_gain: the smallest modularity gain for which another level is made
+        - levels: the levels finished so far, as returned by louvain
+        - modularity: the modularity of the last finished level (of the starting partition before any level)
+        - finished: whether the algorithm has finished
+        - timed_out: whether the last call to run stopped because its time budget ran out
+
+    Representation Invariants:
+        - not (self.finished and self.timed_out)
+        - self._labels.shape[0] == self._current.num_vertices
+        - self._membership.shape[0] == self.graph.num_vertices
+
+    >>> g = CompactGraph(6, np.array([0, 0, 1, 3, 3, 4, 2]), np.array([1, 2, 2, 4, 5, 5, 3]))
+    >>> run = LouvainRun(g)
+    >>> labels, q, timed_out = run.run(time_budget=0)
+    >>> labels.tolist(), round(q, 4), timed_out
+    ([0, 1, 2, 3, 4, 5], -0.1735, True)
+    >>> labels, q, timed_out = run.run()
+    >>> labels.tolist(), round(q, 4), timed_out, run.finished
+    ([0, 0, 0, 1, 1, 1], 0.3571, False, True)
+    """
+    graph: CompactGraph
+    resolution: float
+    min_gain: float
+    levels: list[np.ndarray]
+    modularity: float
+    finished: bool
+    timed_out: bool
+    # Private Instance Attributes:
+    #   - _current: the graph of the level being computed, whose vertices are the communities of the last level
+    #   - _labels: the labels of the vertices of _current after the last finished sweep
+    #   - _membership: _membership[i] is the vertex of _current that contains vertex i of graph
+    #   - _sweeps: the number of sweeps made in the level being computed
+    _current: CompactGraph
+    _labels: np.ndarray
+    _membership: np.ndarray
+    _sweeps: int
+
+    def __init__(self, graph: CompactGraph, resolution: float = 1.0, min_gain: float = 1e-7,
+                 initial_labels: Optional[np.ndarray] = None) -> None:
+        """
+        Initialize a run on graph that has not made any sweep yet.
+
+        Preconditions:
+            - graph.num_vertices > 0
+            - initial_labels is None or len(initial_labels) == graph.num_vertices
+        """
+        self.graph = graph
+        self.resolution = resolution
+        self.min_gain = min_gain
+        self.levels = []
+        self.finished = False
+        self.timed_out = False
+
+        self._current = graph
+        self._membership = np.arange(graph.num_vertices, dtype=np.int64)
+        if initial_labels is None:
+            self._labels = self._membership.copy()
+        else:
+            self._labels = canonical_labels(initial_labels)
+        self._sweeps = 0
+        self.modularity = modularity(graph, self._membership, resolution)
+
+    def run(self, time_budget: Optional[float] = None, max_sweeps: int = 100) -> (np.ndarray, float, bool):
+        """
+        Continue the run until it finishes or time_budget seconds have passed, and return the best partition
+        of graph found so far, its modularity and whether the time budget ran out first.
+
+        Every level makes at most max_sweeps sweeps. If time_budget is None, the run always finishes.
+
+        Preconditions:
+            - time_budget is None or time_budget >= 0
+            - max_sweeps > 0
+        """
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.timed_out = False
+
+        while not self.finished:
+            if deadline is not None and time.monotonic() >= deadline:
+                self.timed_out = True
+                break
+
+            self._labels, _, sweeps, converged = _move_vertices(self._current, self._labels, self.resolution,
+                                                                max_sweeps - self._sweeps, deadline)
+            self._sweeps += sweeps
+            if not converged and self._sweeps < max_sweeps:
+                self.timed_out = True
+                break
+
+            self._finish_level()
+
+        labels, q = self.best_partition()
+
+        return labels, q, self.timed_out
+
+    def best_partition(self) -> (np.ndarray, float):
+        """
+        Return the best partition of graph found so far, numbered by canonical_labels, together with its
+        modularity.
+
+        Before the run finishes, this is the partition at the end of the last sweep, which is never worse than
+        the last finished level.
+        """
+        if self.finished:
+            return self.levels[-1], self.modularity
+
+        # the coarse vertices are numbered by their smallest original vertex, so canonical labels of the
+        # coarse graph are canonical labels of the original graph too
+        labels = canonical_labels(self._labels)
+
+        return labels[self._membership], modularity(self._current, labels, self.resolution)
+
+    def _finish_level(self) -> None:
+        """
+        Record the level given by the converged labels of _current and aggregate it for the next level, or
+        mark the run as finished.
+        """
+        labels = canonical_labels(self._labels)
+        if labels.max() + 1 == self._current.num_vertices:
+            self._finish()
+            return
+
+        self._membership = labels[self._membership]
+        self.levels.append(self._membership)
+        new_q = modularity(self._current, labels, self.resolution)
+        gain, self.modularity = new_q - self.modularity, new_q
+        if gain <= self.min_gain:
+            self._finish()
+            return
+
+        self._current = aggregate(self._current, labels)
+        self._labels = np.arange(self._current.num_vertices, dtype=np.int64)
+        self._sweeps = 0
+
+    def _finish(self) -> None:
+        """Mark the run as finished."""
+        if not self.levels:
+            self.levels.append(self._membership)
+        self.finished = True
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['numpy', 'time', 'compact_graph', 'Optional', 'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
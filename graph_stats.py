@@ -0,0 +1,356 @@
+"""
+This module contains the summary statistics of a graph that are looked at before choosing how to run the
+community detection: the degree distribution, the number of connected components, the clustering
+coefficients and the density.
+
+Everything is computed on the edge arrays of a CompactGraph with NumPy, without converting the graph to
+networkx. The statistics describe the simple, undirected graph underneath (edge weights and directions are
+ignored and self-loops are left out), which matches networkx's degree_histogram, number_connected_components,
+transitivity and average_clustering on the same graph.
+
+Clustering coefficients are found by checking whether wedges (paths u - v - w of two edges) are closed by an
+edge u - w. A graph with at most max_wedges wedges has all of them checked, which gives the exact values. A
+larger graph only has a random sample of max_wedges wedges checked, so the time stays linear in the number of
+edges and the values are estimates.
+
+streaming_summary gives the statistics that do not need clustering for an out_of_core.OutOfCoreGraph,
+reading its edges from disk one chunk at a time. It can be computed before deciding whether a dataset fits
+in memory as a CompactGraph at all.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import numpy as np
+from compact_graph import CompactGraph
+from edge_ingest import canonical_edges, pair_order
+from out_of_core import DEFAULT_CHUNK_SIZE, OutOfCoreGraph, row_blocks
+
+DEFAULT_MAX_WEDGES = 1_000_000
+
+
+def graph_summary(graph: CompactGraph, max_wedges: int = DEFAULT_MAX_WEDGES, seed: int = 0) -> dict[str, float]:
+    """
+    Return the summary statistics of graph: the number of vertices and edges, the density, the number of
+    connected components and the size of the largest one, the largest and the mean degree, the transitivity
+    (the fraction of closed wedges) and the average clustering coefficient.
+
+    'exact_clustering' is whether every wedge was checked; otherwise the last two values are estimated from
+    max_wedges random wedges drawn with the given seed.
+
+    Preconditions:
+        - max_wedges > 0
+
+    >>> g = CompactGraph(5, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> summary = graph_summary(g)
+    >>> summary['components'], summary['largest_component'], summary['density']
+    (2, 4, 0.4)
+    >>> summary['transitivity'], round(summary['average_clustering'], 4), summary['exact_clustering']
+    (0.6, 0.4667, True)
+    """
+    indptr, indices = simple_adjacency(graph)
+    n = graph.num_vertices
+    degrees = np.diff(indptr)
+    num_edges = int(degrees.sum()) // 2
+    component_sizes = np.bincount(connected_components(graph)[1], minlength=1)
+    transitivity, average_clustering, exact = _clustering(indptr, indices, max_wedges, seed)
+
+    return {'vertices': n,
+            'edges': num_edges,
+            'density': 2 * num_edges / (n * (n - 1)) if n > 1 else 0.0,
+            'components': int(np.count_nonzero(component_sizes)),
+            'largest_component': int(component_sizes.max()),
+            'max_degree': int(degrees.max()) if n > 0 else 0,
+            'mean_degree': 2 * num_edges / n if n > 0 else 0.0,
+            'transitivity': transitivity,
+            'average_clustering': average_clustering,
+            'exact_clustering': exact}
+
+
+def simple_adjacency(graph: CompactGraph) -> (np.ndarray, np.ndarray):
+    """
+    Return the (indptr, indices) CSR arrays of the simple, undirected graph underneath graph, with each row's
+    neighbours in increasing order.
+
+    >>> g = CompactGraph(3, np.array([0, 1, 2]), np.array([1, 0, 2]), directed=True)
+    >>> indptr, indices = simple_adjacency(g)
+    >>> indptr.tolist(), indices.tolist()
+    ([0, 1, 2, 2], [1, 0])
+    """
+    n = graph.num_vertices
+    if graph.directed:
+        src, dst, _ = canonical_edges(graph.src, graph.dst, accumulate=False, self_loops='drop')
+        rows, cols = np.concatenate((src, dst)), np.concatenate((dst, src))
+        cols = cols[pair_order(rows, cols)]
+    else:
+        # the CSR adjacency of an undirected graph already is this, apart from the self-loops
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.indptr))
+        not_loop = rows != graph.indices
+        rows, cols = rows[not_loop], graph.indices[not_loop]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    return indptr, cols
+
+
+def degree_histogram(graph: CompactGraph) -> np.ndarray:
+    """
+    Return the degree histogram of graph, where histogram[d] is the number of vertices with d distinct
+    neighbours.
+
+    >>> degree_histogram(CompactGraph(5, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))).tolist()
+    [1, 1, 2, 1]
+    """
+    return np.bincount(np.diff(simple_adjacency(graph)[0]), minlength=1)
+
+
+def connected_components(graph: CompactGraph) -> (int, np.ndarray):
+    """
+    Return the number of (weakly) connected components of graph and the component of every vertex, where
+    components are numbered in increasing order of their smallest vertex.
+
+    Every vertex is repeatedly given the smallest label at either end of its edges, and then the labels are
+    followed until they stop changing (pointer jumping), so the number of passes over the edges grows with
+    the logarithm of the component diameter rather than with the diameter itself.
+
+    >>> count, labels = connected_components(CompactGraph(5, np.array([0, 3, 1]), np.array([1, 4, 0])))
+    >>> count, labels.tolist()
+    (3, [0, 0, 1, 2, 2])
+    """
+    n = graph.num_vertices
+    src, dst = graph.src, graph.dst
+    parent = np.arange(n, dtype=np.int64)
+
+    while True:
+        low = np.minimum(parent[src], parent[dst])
+        high = np.maximum(parent[src], parent[dst])
+        differ = low != high
+        if not differ.any():
+            break
+        np.minimum.at(parent, high[differ], low[differ])
+
+        # every label is a vertex of the same component, so following labels never leaves the component
+        grandparent = parent[parent]
+        while np.any(grandparent != parent):
+            parent = grandparent
+            grandparent = parent[parent]
+
+    roots, labels = np.unique(parent, return_inverse=True)
+
+    return roots.shape[0], labels.reshape(-1)
+
+
+def streaming_summary(graph: OutOfCoreGraph, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict[str, float]:
+    """
+    Return the statistics of graph_summary that do not need clustering coefficients (the numbers of vertices
+    and edges, the density, the components and the degrees) for an out-of-core graph, reading about
+    chunk_size edges from disk at a time.
+
+    Preconditions:
+        - chunk_size > 0
+    """
+    n = graph.num_vertices
+    degrees = streaming_degrees(graph, chunk_size)
+    num_edges = int(degrees.sum()) // 2
+    component_sizes = np.bincount(streaming_connected_components(graph, chunk_size)[1], minlength=1)
+
+    return {'vertices': n,
+            'edges': num_edges,
+            'density': 2 * num_edges / (n * (n - 1)) if n > 1 else 0.0,
+            'components': int(np.count_nonzero(component_sizes)),
+            'largest_component': int(component_sizes.max()),
+            'max_degree': int(degrees.max()) if n > 0 else 0,
+            'mean_degree': 2 * num_edges / n if n > 0 else 0.0}
+
+
+def streaming_degrees(graph: OutOfCoreGraph, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Return the number of distinct neighbours of every vertex of an out-of-core graph, leaving out self-loops.
+    np.bincount of the result is the degree histogram, as given by degree_histogram for a CompactGraph.
+
+    The repeated edges stored on disk are merged one block of consecutive rows of the CSR adjacency at a time,
+    each holding about chunk_size entries (in each direction, if graph is directed).
+
+    Preconditions:
+        - chunk_size > 0
+    """
+    csr_arrays = [(graph.indptr, graph.indices)]
+    if graph.directed:
+        csr_arrays.append((graph.in_indptr, graph.in_indices))
+
+    degrees = np.zeros(graph.num_vertices, dtype=np.int64)
+    for start, end in row_blocks(graph.indptr, chunk_size):
+        rows, cols = [], []
+        for indptr, indices in csr_arrays:
+            rows.append(np.repeat(np.arange(start, end, dtype=np.int64), np.diff(indptr[start:end + 1])))
+            cols.append(np.asarray(indices[indptr[start]:indptr[end]]))
+        block_rows, block_cols = np.concatenate(rows), np.concatenate(cols)
+        not_loop = block_rows != block_cols
+        block_rows, _, _ = canonical_edges(block_rows[not_loop], block_cols[not_loop], accumulate=False,
+                                           directed=True)
+        degrees[start:end] = np.bincount(block_rows - start, minlength=end - start)
+
+    return degrees
+
+
+def streaming_connected_components(graph: OutOfCoreGraph,
+                                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> (int, np.ndarray):
+    """
+    Return connected_components for an out-of-core graph, reading chunk_size edges from disk at a time.
+
+    Every pass over the edge chunks gives each vertex the smallest label at either end of its edges, and the
+    labels are then followed until they stop changing, until a pass changes nothing.
+
+    Preconditions:
+        - chunk_size > 0
+    """
+    parent = np.arange(graph.num_vertices, dtype=np.int64)
+
+    changed = True
+    while changed:
+        changed = False
+        for src, dst, _ in graph.edge_chunks(chunk_size):
+            low = np.minimum(parent[src], parent[dst])
+            high = np.maximum(parent[src], parent[dst])
+            differ = low != high
+            if differ.any():
+                changed = True
+                np.minimum.at(parent, high[differ], low[differ])
+
+        grandparent = parent[parent]
+        while np.any(grandparent != parent):
+            parent = grandparent
+            grandparent = parent[parent]
+
+    roots, labels = np.unique(parent, return_inverse=True)
+
+    return roots.shape[0], labels.reshape(-1)
+
+def clustering(graph: CompactGraph, max_wedges: int = DEFAULT_MAX_WEDGES,
+               seed: int = 0) -> (float, float, bool):
+    """
+    Return the transitivity and the average clustering coefficient of graph, and whether they are exact.
+
+    The clustering coefficient of a vertex is the fraction of the wedges centred at it that are closed, and
+    is 0 for a vertex with fewer than two neighbours. If graph has more than max_wedges wedges, the
+    transitivity is estimated from max_wedges wedges drawn uniformly at random, and the average clustering
+    from one random wedge at each of max_wedges random vertices.
+
+    Preconditions:
+        - max_wedges > 0
+
+    >>> g = CompactGraph(5, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> clustering(g)
+    (0.6, 0.4666666666666667, True)
+    >>> transitivity, average, exact = clustering(g, max_wedges=2)
+    >>> exact, 0 <= transitivity <= 1, 0 <= average <= 1
+    (False, True, True)
+    """
+    indptr, indices = simple_adjacency(graph)
+
+    return _clustering(indptr, indices, max_wedges, seed)
+
+
+def _clustering(indptr: np.ndarray, indices: np.ndarray, max_wedges: int, seed: int) -> (float, float, bool):
+    """Return clustering(graph, max_wedges, seed), given the simple_adjacency of graph."""
+    n = indptr.shape[0] - 1
+    degrees = np.diff(indptr)
+    wedge_counts = degrees * (degrees - 1) // 2
+    total_wedges = int(wedge_counts.sum())
+    if total_wedges == 0:
+        return 0.0, 0.0, True
+
+    # the rows and the neighbours within each row are in increasing order, so these keys are sorted
+    edge_keys = np.repeat(np.arange(n, dtype=np.int64), degrees) * n + indices
+
+    if total_wedges <= max_wedges:
+        centres, first, second = _all_wedges(indptr, degrees)
+        closed = _is_edge(edge_keys, indices[first], indices[second], n)
+        closed_counts = np.bincount(centres[closed], minlength=n)
+        has_wedges = wedge_counts > 0
+        local = np.zeros(n)
+        local[has_wedges] = closed_counts[has_wedges] / wedge_counts[has_wedges]
+
+        return float(closed_counts.sum() / total_wedges), float(local.mean()), True
+
+    rng = np.random.default_rng(seed)
+    # wedges drawn uniformly: the centre with probability proportional to its number of wedges
+    centres = np.searchsorted(np.cumsum(wedge_counts), np.sort(rng.integers(0, total_wedges, max_wedges)),
+                              side='right')
+    transitivity = _closed_fraction(_random_wedges(indptr, indices, degrees, centres, rng), edge_keys, n)
+
+    # one wedge at each of some uniformly drawn vertices, which have a clustering coefficient of 0 if they
+    # have fewer than two neighbours
+    with_wedges = np.flatnonzero(wedge_counts > 0)
+    centres = with_wedges[rng.integers(0, with_wedges.shape[0], max_wedges)]
+    average = _closed_fraction(_random_wedges(indptr, indices, degrees, centres, rng), edge_keys, n)
+
+    return transitivity, average * with_wedges.shape[0] / n, False
+
+
+def _all_wedges(indptr: np.ndarray, degrees: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Return the centre of every wedge of the graph with the given CSR row pointers, and the positions in the
+    CSR indices of its two other vertices (the first before the second in the row).
+    """
+    # entry e of a row is paired with every later entry of the same row
+    row_ends = np.repeat(indptr[1:], degrees)
+    entries = np.arange(row_ends.shape[0], dtype=np.int64)
+    later = row_ends - entries - 1
+    first = np.repeat(entries, later)
+    offsets = np.arange(first.shape[0], dtype=np.int64) - np.repeat(np.cumsum(later) - later, later)
+    centres = np.repeat(np.arange(degrees.shape[0], dtype=np.int64), degrees)[first]
+
+    return centres, first, first + 1 + offsets
+
+
+def _random_wedges(indptr: np.ndarray, indices: np.ndarray, degrees: np.ndarray, centres: np.ndarray,
+                   rng: np.random.Generator) -> (np.ndarray, np.ndarray):
+    """
+    Return the two other vertices of a uniformly random wedge at each of the given centres.
+
+    Preconditions:
+        - all(degrees[v] >= 2 for v in centres)
+    """
+    centre_degrees = degrees[centres]
+    first = rng.integers(0, centre_degrees)
+    # the second neighbour is drawn from the other degree - 1 neighbours
+    second = rng.integers(0, centre_degrees - 1)
+    second += second >= first
+
+    return indices[indptr[centres] + first], indices[indptr[centres] + second]
+
+
+def _closed_fraction(ends: (np.ndarray, np.ndarray), edge_keys: np.ndarray, n: int) -> float:
+    """Return the fraction of the wedges with the given end vertices that are closed by an edge."""
+    return float(np.mean(_is_edge(edge_keys, ends[0], ends[1], n)))
+
+
+def _is_edge(edge_keys: np.ndarray, u: np.ndarray, v: np.ndarray, n: int) -> np.ndarray:
+    """
+    Return whether each (u[i], v[i]) is an edge, where edge_keys is the sorted array of row * n + column
+    over the CSR entries of the graph.
+    """
+    keys = u * n + v
+    # looking the keys up in increasing order reads edge_keys from front to back, which is much faster than
+    # random lookups when edge_keys does not fit in the CPU caches
+    order = np.argsort(keys)
+    positions = np.minimum(np.searchsorted(edge_keys, keys[order]), edge_keys.shape[0] - 1)
+    found = np.empty(keys.shape[0], dtype=bool)
+    found[order] = edge_keys[positions] == keys[order]
+
+    return found
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['numpy', 'compact_graph', 'edge_ingest', 'out_of_core', 'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -16,7 +16,6 @@ def get_weighted_graph(g: WeightedGraph, communities: dict[int, int]) -> Weighte
     identifying integer
 
     Preconditions:
-        - list(communites.values()) == sorted(communites.values())
         - all(v in g.vertices for v in communites)
 
     >>> ex_communities = {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
@@ -66,10 +65,9 @@ def get_edge_weights(communities: dict[int, int], outer_edges: list[set]) -> \
     Within the tuple, the edges are represented as a list with each element being a
     vertices/community and the edge weight is represented as an integer.
 
-    Represented as follows: ([community1 id, community2 id], weight)
+    Represented as follows: ([community1 id, community2 id], weight), with community1 id < community2 id
 
     Preconditions:
-        - list(communites.values()) == sorted(communites.values())
         - every e in outer edges is an existing edge in a graph
 
     >>> ex_communities = {1: 0, 2: 0, 3: 0, 4: 1, 5: 2}
@@ -93,7 +91,7 @@ def get_edge_weights(communities: dict[int, int], outer_edges: list[set]) -> \
         else:
             edges_dict[edge_name] = 1
 
-    return [(list(key), edges_dict[key]) for key in edges_dict]
+    return [(sorted(key), edges_dict[key]) for key in edges_dict]
 
 
 def get_all_members(community: _Vertex) -> dict[int, _Vertex]:
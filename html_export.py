@@ -0,0 +1,325 @@
+"""
+This module contains the interactive HTML export of a partitioned graph.
+
+The export is one self-contained .html file that opens in a browser without a server. It shows the community
+graph first: one circle per community, sized by its number of members, with the heaviest links between
+communities. Clicking a community expands it into its member vertices and the edges inside it; clicking it
+again collapses it. The members of each community are stored as a separate JSON block in the file and only
+parsed when the community is first expanded, so the page opens quickly even for graphs far larger than the
+620 vertex FoodNet set.
+
+All positions are computed here, so the browser does no layout work. Communities are placed on a spiral
+with the largest at the centre, and the members of a community on a sunflower (phyllotaxis) spiral inside
+its circle.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import json
+from functools import lru_cache
+import distinctipy
+import numpy as np
+from compact_graph import CompactGraph
+from compact_louvain import aggregate
+
+MAX_DISTINCT_COLOURS = 32
+COLOUR_SEED = 0
+DEFAULT_MAX_LINKS = 5000
+_GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+
+@lru_cache(maxsize=32)
+def community_colours(count: int) -> tuple[str, ...]:
+    """
+    Return count hex colour strings, one per community.
+
+    Colours are generated with distinctipy from a fixed seed once per count and cached, so the same
+    community always gets the same colour. Beyond MAX_DISTINCT_COLOURS the colours
+    repeat, since distinctipy slows down sharply for more colours and they could not be told apart anyway.
+
+    >>> len(community_colours(3)), community_colours(3)[0].startswith('#')
+    (3, True)
+    """
+    distinct = distinctipy.get_colors(min(count, MAX_DISTINCT_COLOURS), rng=COLOUR_SEED)
+    hex_colours = [distinctipy.get_hex(colour) for colour in distinct]
+
+    return tuple(hex_colours[i % len(hex_colours)] for i in range(count))
+
+
+def spiral_positions(count: int, radius: float = 1.0) -> np.ndarray:
+    """
+    Return a (count, 2) array of points spread evenly over a disk of the given radius, the first at the centre.
+
+    >>> spiral_positions(3).shape
+    (3, 2)
+    >>> spiral_positions(1).tolist()
+    [[0.0, 0.0]]
+    """
+    i = np.arange(count)
+    r = radius * np.sqrt(i / max(count - 1, 1))
+    theta = i * _GOLDEN_ANGLE
+
+    return np.column_stack((r * np.cos(theta), r * np.sin(theta)))
+
+
+def export_html(graph: CompactGraph, labels: np.ndarray, names: dict[int, str], path: str,
+                title: str = 'FoodNet communities', max_links: int = DEFAULT_MAX_LINKS) -> None:
+    """
+    Write the interactive HTML view of the partition where vertex i of graph is in community labels[i] to path.
+
+    names maps the item of each vertex (graph.items) to the label shown for it. At most max_links links
+    between communities, the heaviest ones, are drawn in the community view.
+
+    Preconditions:
+        - len(labels) == graph.num_vertices
+        - all(item in names for item in graph.items)
+        - path is a writable file path
+    """
+    communities, labels = np.unique(np.asarray(labels), return_inverse=True)
+    k = communities.shape[0]
+    sizes = np.bincount(labels, minlength=k)
+    colours = community_colours(k)
+
+    radii = np.sqrt(sizes)
+    centres = _community_centres(sizes)
+
+    coarse = aggregate(graph, labels)
+    between = coarse.src != coarse.dst
+    link_src, link_dst, link_weights = coarse.src[between], coarse.dst[between], coarse.weights[between]
+    heaviest = np.argsort(-link_weights, kind='stable')[:max_links]
+
+    overview = {
+        'title': title,
+        'communities': [{'id': int(communities[c]), 'x': round(float(centres[c, 0]), 3),
+                         'y': round(float(centres[c, 1]), 3), 'r': round(float(radii[c]), 3),
+                         'size': int(sizes[c]), 'colour': colours[c]} for c in range(k)],
+        'links': [[int(link_src[e]), int(link_dst[e]), float(link_weights[e])] for e in heaviest]
+    }
+
+    blocks = [_json_block('overview', overview)]
+    blocks.extend(_json_block(f'community-{c}', members) for c, members in enumerate(
+        _community_members(graph, labels, k, names, centres, radii)))
+
+    with open(path, mode='w', encoding='utf-8') as file:
+        file.write(_PAGE.replace('__TITLE__', _escape_html(title)).replace('__DATA__', '\n'.join(blocks)))
+
+
+def _community_centres(sizes: np.ndarray) -> np.ndarray:
+    """
+    Return the centre of the circle of every community, on a spiral with the largest community at the centre.
+
+    The distance of a community from the centre grows with the square root of the total size of the larger
+    communities, so that circles with area proportional to size rarely overlap.
+    """
+    by_size = np.argsort(-sizes, kind='stable')
+    sorted_sizes = sizes[by_size].astype(np.float64)
+    before = np.cumsum(sorted_sizes) - sorted_sizes
+    r = np.where(before > 0, 2.0 * np.sqrt(before + sorted_sizes / 2), 0.0)
+    theta = np.arange(sizes.shape[0]) * _GOLDEN_ANGLE
+
+    centres = np.zeros((sizes.shape[0], 2))
+    centres[by_size] = np.column_stack((r * np.cos(theta), r * np.sin(theta)))
+
+    return centres
+
+
+def _community_members(graph: CompactGraph, labels: np.ndarray, k: int, names: dict[int, str],
+                       centres: np.ndarray, radii: np.ndarray) -> list[dict]:
+    """
+    Return, for every community, the names and positions of its members and its inner edges as pairs of
+    member positions in that list.
+    """
+    order = np.argsort(labels, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=k))))
+    local_index = np.empty(labels.shape[0], dtype=np.int64)
+    local_index[order] = np.arange(labels.shape[0]) - starts[labels[order]]
+
+    inner = (labels[graph.src] == labels[graph.dst]) & (graph.src != graph.dst)
+    inner_src, inner_dst = graph.src[inner], graph.dst[inner]
+    edge_order = np.argsort(labels[inner_src], kind='stable')
+    inner_src, inner_dst = inner_src[edge_order], inner_dst[edge_order]
+    edge_starts = np.concatenate(([0], np.cumsum(np.bincount(labels[inner_src], minlength=k))))
+
+    all_members = []
+    for c in range(k):
+        vertices = order[starts[c]:starts[c + 1]]
+        positions = centres[c] + spiral_positions(vertices.shape[0], radius=0.9 * radii[c])
+        edge_range = slice(edge_starts[c], edge_starts[c + 1])
+        all_members.append({
+            'names': [names[item] for item in graph.items[vertices].tolist()],
+            'xy': np.round(positions, 3).ravel().tolist(),
+            'edges': np.column_stack((local_index[inner_src[edge_range]],
+                                      local_index[inner_dst[edge_range]])).ravel().tolist()
+        })
+
+    return all_members
+
+
+def _json_block(block_id: str, value: object) -> str:
+    """Return value as an inline JSON script block that the browser does not parse until asked to."""
+    text = json.dumps(value, separators=(',', ':')).replace('</', '<\\/')
+
+    return f'<script type="application/json" id="{block_id}">{text}</script>'
+
+
+def _escape_html(text: str) -> str:
+    """Return text with the HTML special characters escaped."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  html, body { margin: 0; height: 100%; overflow: hidden; font-family: sans-serif; }
+  canvas { display: block; }
+  #info { position: absolute; top: 8px; left: 8px; background: rgba(255, 255, 255, 0.85); padding: 4px 8px; }
+</style>
+</head>
+<body>
+<div id="info">__TITLE__: click a community to expand or collapse it, drag to pan, scroll to zoom.</div>
+<canvas id="view"></canvas>
+__DATA__
+<script>
+const overview = JSON.parse(document.getElementById('overview').textContent);
+const members = new Map();
+const expanded = new Set();
+const canvas = document.getElementById('view');
+const ctx = canvas.getContext('2d');
+let scale = 1, offsetX = 0, offsetY = 0, dragging = null, moved = false;
+
+function loadMembers(c) {
+  if (!members.has(c)) {
+    members.set(c, JSON.parse(document.getElementById('community-' + c).textContent));
+  }
+  return members.get(c);
+}
+
+function fit() {
+  canvas.width = window.innerWidth;
+  canvas.height = window.innerHeight;
+  let extent = 1;
+  for (const c of overview.communities) {
+    extent = Math.max(extent, Math.abs(c.x) + c.r, Math.abs(c.y) + c.r);
+  }
+  scale = Math.min(canvas.width, canvas.height) / (2.2 * extent);
+  offsetX = canvas.width / 2;
+  offsetY = canvas.height / 2;
+  draw();
+}
+
+function draw() {
+  ctx.setTransform(1, 0, 0, 1, 0, 0);
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.setTransform(scale, 0, 0, scale, offsetX, offsetY);
+  const cs = overview.communities;
+  ctx.lineWidth = 1 / scale;
+  ctx.strokeStyle = 'rgba(0, 0, 0, 0.15)';
+  ctx.beginPath();
+  for (const [a, b] of overview.links) {
+    ctx.moveTo(cs[a].x, cs[a].y);
+    ctx.lineTo(cs[b].x, cs[b].y);
+  }
+  ctx.stroke();
+  cs.forEach((c, i) => {
+    ctx.globalAlpha = expanded.has(i) ? 0.15 : 0.8;
+    ctx.fillStyle = c.colour;
+    ctx.beginPath();
+    ctx.arc(c.x, c.y, c.r, 0, 2 * Math.PI);
+    ctx.fill();
+    ctx.globalAlpha = 1;
+    if (expanded.has(i)) {
+      drawMembers(i, c);
+    }
+  });
+}
+
+function drawMembers(i, c) {
+  const m = loadMembers(i);
+  const r = Math.max(c.r / Math.sqrt(m.names.length) / 3, 0.5 / scale);
+  ctx.strokeStyle = 'rgba(0, 0, 0, 0.3)';
+  ctx.beginPath();
+  for (let e = 0; e < m.edges.length; e += 2) {
+    const a = m.edges[e], b = m.edges[e + 1];
+    ctx.moveTo(m.xy[2 * a], m.xy[2 * a + 1]);
+    ctx.lineTo(m.xy[2 * b], m.xy[2 * b + 1]);
+  }
+  ctx.stroke();
+  ctx.fillStyle = c.colour;
+  for (let v = 0; v < m.names.length; v++) {
+    ctx.beginPath();
+    ctx.arc(m.xy[2 * v], m.xy[2 * v + 1], r, 0, 2 * Math.PI);
+    ctx.fill();
+  }
+  if (r * scale > 3) {
+    ctx.fillStyle = 'black';
+    ctx.font = (10 / scale) + 'px sans-serif';
+    m.names.forEach((name, v) => ctx.fillText(name, m.xy[2 * v] + r, m.xy[2 * v + 1]));
+  }
+}
+
+function communityAt(px, py) {
+  const x = (px - offsetX) / scale, y = (py - offsetY) / scale;
+  let best = -1, bestR = Infinity;
+  overview.communities.forEach((c, i) => {
+    if ((x - c.x) ** 2 + (y - c.y) ** 2 <= c.r * c.r && c.r < bestR) {
+      best = i;
+      bestR = c.r;
+    }
+  });
+  return best;
+}
+
+canvas.addEventListener('mousedown', e => { dragging = [e.clientX, e.clientY]; moved = false; });
+canvas.addEventListener('mousemove', e => {
+  if (dragging) {
+    offsetX += e.clientX - dragging[0];
+    offsetY += e.clientY - dragging[1];
+    moved = moved || Math.abs(e.clientX - dragging[0]) + Math.abs(e.clientY - dragging[1]) > 2;
+    dragging = [e.clientX, e.clientY];
+    draw();
+  }
+});
+canvas.addEventListener('mouseup', e => {
+  dragging = null;
+  if (!moved) {
+    const c = communityAt(e.clientX, e.clientY);
+    if (c >= 0) {
+      expanded.has(c) ? expanded.delete(c) : expanded.add(c);
+      const info = overview.communities[c];
+      document.getElementById('info').textContent = 'Community ' + info.id + ': ' + info.size + ' members';
+      draw();
+    }
+  }
+});
+canvas.addEventListener('wheel', e => {
+  e.preventDefault();
+  const factor = e.deltaY < 0 ? 1.2 : 1 / 1.2;
+  offsetX = e.clientX - (e.clientX - offsetX) * factor;
+  offsetY = e.clientY - (e.clientY - offsetY) * factor;
+  scale *= factor;
+  draw();
+}, {passive: false});
+window.addEventListener('resize', fit);
+fit();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['json', 'functools', 'distinctipy', 'numpy', 'compact_graph', 'compact_louvain',
+                          'annotations'],
+        'allowed-io': ['export_html'],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,160 @@
+"""
+This module contains the bulk conversions between a CompactGraph and networkx or SciPy sparse matrices.
+
+The conversions work on whole edge arrays, so every edge is handed over once and in one call (e.g.
+add_weighted_edges_from) rather than with one add_edge call per edge, and the edge weights are kept. This
+makes it cheap to check a partition against networkx's own algorithms, for example
+
+    graph_nx = to_networkx(graph, labels)
+    communities = nx.community.louvain_communities(graph_nx, weight='weight', seed=0)
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from typing import Any, Optional
+import networkx as nx
+import numpy as np
+import scipy.sparse
+from compact_graph import CompactGraph
+
+
+def to_networkx(graph: CompactGraph, labels: Optional[np.ndarray] = None) -> nx.Graph:
+    """
+    Return graph as a networkx Graph (a DiGraph if graph is directed) whose nodes are the items of graph and
+    whose edges have their weight in the 'weight' attribute.
+
+    If labels is given, the community of every vertex is kept as the 'community' node attribute.
+
+    Preconditions:
+        - labels is None or len(labels) == graph.num_vertices
+
+    >>> g = CompactGraph.from_item_edges(np.array([10, 20, 30]), np.array([10, 20, 20]), np.array([20, 30, 10]))
+    >>> graph_nx = to_networkx(g, np.array([0, 0, 1]))
+    >>> sorted(graph_nx.edges(data='weight'))
+    [(10, 20, 2), (20, 30, 1)]
+    >>> graph_nx.nodes[30]['community']
+    1
+    """
+    graph_nx = nx.DiGraph() if graph.directed else nx.Graph()
+    items = graph.items.tolist()
+
+    if labels is None:
+        graph_nx.add_nodes_from(items)
+    else:
+        graph_nx.add_nodes_from((item, {'community': label}) for item, label in zip(items, labels.tolist()))
+    graph_nx.add_weighted_edges_from(zip(graph.items[graph.src].tolist(), graph.items[graph.dst].tolist(),
+                                         graph.weights.tolist()))
+
+    return graph_nx
+
+
+def from_networkx(graph_nx: nx.Graph, weight: str = 'weight') -> CompactGraph:
+    """
+    Return graph_nx as a CompactGraph, directed if graph_nx is, where vertex i is the i-th node of graph_nx
+    and keeps it as its item.
+
+    An edge without the weight attribute gets weight 1.
+
+    >>> graph_nx = nx.Graph()
+    >>> graph_nx.add_weighted_edges_from([('a', 'b', 3), ('b', 'c', 1)])
+    >>> g = from_networkx(graph_nx)
+    >>> g.items.tolist(), g.src.tolist(), g.dst.tolist(), g.weights.tolist()
+    (['a', 'b', 'c'], [0, 1], [1, 2], [3, 1])
+    """
+    index = {node: i for i, node in enumerate(graph_nx.nodes)}
+    edges = list(graph_nx.edges(data=weight, default=1))
+    src = np.fromiter((index[edge[0]] for edge in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[edge[1]] for edge in edges), dtype=np.int64, count=len(edges))
+    weights = np.array([edge[2] for edge in edges])
+
+    return CompactGraph(len(index), src, dst, weights if edges else None, graph_nx.is_directed(),
+                        _item_array(list(index)))
+
+
+def community_labels(graph_nx: nx.Graph, graph: CompactGraph, attribute: str = 'community') -> np.ndarray:
+    """
+    Return the labels array of graph given by the attribute node attribute of graph_nx, e.g. the communities
+    kept by to_networkx.
+
+    Preconditions:
+        - every item of graph is a node of graph_nx with the given attribute
+
+    >>> g = CompactGraph(3, np.array([0]), np.array([1]))
+    >>> community_labels(to_networkx(g, np.array([1, 1, 0])), g).tolist()
+    [1, 1, 0]
+    """
+    communities = graph_nx.nodes(data=attribute)
+
+    return np.array([communities[item] for item in graph.items.tolist()], dtype=np.int64)
+
+
+def to_sparse(graph: CompactGraph) -> scipy.sparse.csr_array:
+    """
+    Return the weighted adjacency matrix of graph as a SciPy CSR array, where entry (i, j) is the weight of
+    the edge from vertex i to vertex j.
+
+    The matrix of an undirected graph is symmetric, with a self-loop on the diagonal once. The CSR arrays of
+    graph are used as they are, without building the matrix entry by entry.
+
+    >>> g = CompactGraph(3, np.array([0, 1, 2]), np.array([1, 2, 2]), np.array([4, 1, 2]))
+    >>> to_sparse(g).toarray().tolist()
+    [[0, 4, 0], [4, 0, 1], [0, 1, 2]]
+    """
+    n = graph.num_vertices
+
+    return scipy.sparse.csr_array((graph.data, graph.indices, graph.indptr), shape=(n, n))
+
+
+def from_sparse(matrix: Any, directed: bool = False, items: Optional[np.ndarray] = None) -> CompactGraph:
+    """
+    Return the CompactGraph with the weighted adjacency matrix, the inverse of to_sparse.
+
+    matrix can be any SciPy sparse matrix or array. For an undirected graph only the entries on or above the
+    diagonal are read, so the matrix should be symmetric.
+
+    Preconditions:
+        - matrix is square
+        - items is None or len(items) == matrix.shape[0]
+
+    >>> g = CompactGraph(3, np.array([0, 1, 2]), np.array([1, 2, 2]), np.array([4, 1, 2]))
+    >>> new_g = from_sparse(to_sparse(g))
+    >>> new_g.src.tolist(), new_g.dst.tolist(), new_g.weights.tolist()
+    ([0, 1, 2], [1, 2, 2], [4, 1, 2])
+    """
+    coo = scipy.sparse.coo_array(matrix)
+    rows, cols, values = coo.row.astype(np.int64), coo.col.astype(np.int64), coo.data
+    if not directed:
+        upper = rows <= cols
+        rows, cols, values = rows[upper], cols[upper], values[upper]
+
+    return CompactGraph(coo.shape[0], rows, cols, values, directed, items)
+
+
+def _item_array(items: list) -> np.ndarray:
+    """
+    Return items as a NumPy array: an integer or string array when all the items are integers or all are
+    strings, and an object array (keeping every item, e.g. a tuple, as one element) otherwise.
+    """
+    if all(isinstance(item, int) for item in items):
+        return np.array(items, dtype=np.int64)
+    elif all(isinstance(item, str) for item in items):
+        return np.array(items)
+
+    array = np.empty(len(items), dtype=object)
+    array[:] = items
+
+    return array
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['networkx', 'numpy', 'scipy.sparse', 'compact_graph', 'Any', 'Optional', 'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,179 @@
+"""
+This module contains label propagation, a fast first-cut community detection for very large graphs.
+
+Every vertex starts with its own label and repeatedly takes the label with the largest total edge weight
+among its neighbours. Each round is computed for many vertices at once with NumPy on the CSR arrays of a
+CompactGraph. Only vertices with a neighbour whose label changed are looked at again, and a round only reads
+the adjacency of the vertices it updates, so the total work is close to linear in the number of edges.
+
+To avoid the oscillation of fully synchronous updates, only a random fraction of the vertices is updated in
+each round, which makes the process behave like the asynchronous version of the algorithm. The result can be
+used on its own, or as the starting partition of the Louvain algorithm:
+
+    levels, q = compact_louvain.louvain(graph, initial_labels=label_propagation(graph))
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+from compact_graph import CompactGraph
+from compact_louvain import canonical_labels
+
+DEFAULT_MAX_ROUNDS = 100
+
+
+def label_propagation(graph: CompactGraph, max_rounds: int = DEFAULT_MAX_ROUNDS, update_fraction: float = 0.5,
+                      seed: int = 0) -> np.ndarray:
+    """
+    Return the partition of graph found by label propagation, numbered by compact_louvain.canonical_labels.
+
+    In each round, every active vertex is updated with probability update_fraction. A vertex keeps its label
+    when it is one of the heaviest among its neighbours, and otherwise takes the smallest of the heaviest
+    labels. The edges of a directed graph are followed in both directions. The process stops when no vertex
+    can change its label any more or after max_rounds rounds; the result only depends on graph and seed.
+
+    A vertex is only looked at again when one of its neighbours moved to a label other than its own. On a
+    graph of 10 million edges, 2 million vertices and planted communities of 50 vertices, this takes about
+    16 seconds on one core (about 80 rounds tallying 100 million neighbour labels in total), on top of the
+    4.5 seconds taken to build the CompactGraph. Most of the work is in the first rounds, where most labels
+    change, so a smaller max_rounds or update_fraction saves little time (and a larger update_fraction
+    takes longer but merges more).
+
+    Preconditions:
+        - 0 < update_fraction <= 1
+
+    >>> g = CompactGraph(6, np.array([0, 0, 1, 3, 3, 4, 2]), np.array([1, 2, 2, 4, 5, 5, 3]))
+    >>> label_propagation(g, seed=1).tolist()
+    [0, 0, 0, 1, 1, 1]
+    >>> from compact_louvain import louvain
+    >>> levels, q = louvain(g, initial_labels=label_propagation(g, seed=1))
+    >>> round(q, 4)
+    0.3571
+    """
+    n = graph.num_vertices
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n, dtype=np.int64)
+    indptr, indices, weights = _neighbour_csr(graph)
+    degrees = np.diff(indptr)
+    unit_weights = bool(np.all(weights == 1))
+
+    active = np.ones(n, dtype=bool)
+    for _ in range(max_rounds):
+        candidates = np.flatnonzero(active)
+        update = candidates[rng.random(candidates.shape[0]) < update_fraction]
+        entries = _row_entries(indptr, update)
+        rows = np.repeat(update, degrees[update])
+        changed = _propagate_round(rows, labels[indices[entries]], None if unit_weights else weights[entries],
+                                   labels, n)
+
+        # a vertex is looked at again if it was skipped this round or one of its neighbours changed label,
+        # unless that neighbour took the vertex's own label, which only makes its label heavier
+        active[update] = False
+        entries = _row_entries(indptr, changed)
+        neighbours = indices[entries]
+        active[neighbours[labels[neighbours] != np.repeat(labels[changed], degrees[changed])]] = True
+        if not active.any():
+            break
+
+    return canonical_labels(labels)
+
+
+def _neighbour_csr(graph: CompactGraph) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Return the (indptr, indices, weights) CSR arrays of the neighbours of every vertex of graph, leaving out
+    self-loops and following directed edges both ways.
+    """
+    n = graph.num_vertices
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.indptr))
+    cols, weights = graph.indices, graph.data.astype(np.float64)
+    if graph.directed:
+        in_rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.in_indptr))
+        rows, cols = np.concatenate((rows, in_rows)), np.concatenate((cols, graph.in_indices))
+        weights = np.concatenate((weights, graph.in_data.astype(np.float64)))
+        order = np.argsort(rows, kind='stable')
+        rows, cols, weights = rows[order], cols[order], weights[order]
+
+    not_loop = rows != cols
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[not_loop], minlength=n), out=indptr[1:])
+
+    return indptr, cols[not_loop], weights[not_loop]
+
+
+def _row_entries(indptr: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """
+    Return the positions of the CSR entries of the given rows, row after row, without scanning other rows.
+
+    >>> _row_entries(np.array([0, 2, 2, 5]), np.array([0, 2])).tolist()
+    [0, 1, 2, 3, 4]
+    """
+    lengths = indptr[vertices + 1] - indptr[vertices]
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    row_offsets = np.cumsum(lengths) - lengths
+
+    return np.repeat(indptr[vertices] - row_offsets, lengths) + np.arange(total)
+
+
+def _propagate_round(rows: np.ndarray, neighbour_labels: np.ndarray, weights: Optional[np.ndarray],
+                     labels: np.ndarray, n: int) -> np.ndarray:
+    """
+    Give each vertex in rows the heaviest label among its neighbours, updating labels in place, and return the
+    vertices whose label changed.
+
+    rows[e] is a vertex (in non-decreasing order), neighbour_labels[e] the label of one of its neighbours and
+    weights[e] the weight of the edge between them, or weights is None when every edge has weight 1.
+    """
+    if rows.shape[0] == 0:
+        return rows
+
+    # total weight of every (vertex, label) pair, sorted by vertex and then label; with unit weights the
+    # totals are counts, so the keys can be sorted directly, which is much faster than an argsort
+    keys = rows * n + neighbour_labels
+    if weights is None:
+        keys = np.sort(keys)
+    else:
+        order = np.argsort(keys)
+        keys, weights = keys[order], weights[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    if weights is None:
+        totals = np.diff(np.append(starts, keys.shape[0]))
+    else:
+        totals = np.add.reduceat(weights, starts)
+    pair_rows, pair_labels = np.divmod(keys[starts], n)
+
+    row_starts = np.flatnonzero(np.concatenate(([True], pair_rows[1:] != pair_rows[:-1])))
+    row_counts = np.diff(np.append(row_starts, pair_rows.shape[0]))
+    best_total = np.repeat(np.maximum.reduceat(totals, row_starts), row_counts)
+    is_best = totals >= best_total * (1 - 1e-12)
+
+    # the smallest heaviest label of each vertex, unless its current label is also one of the heaviest
+    best = np.flatnonzero(is_best)
+    best_pair_rows = pair_rows[best]
+    first_best = best[np.concatenate(([True], best_pair_rows[1:] != best_pair_rows[:-1]))]
+    best_rows, new_labels = pair_rows[first_best], pair_labels[first_best]
+    keeps_current = np.zeros(n, dtype=bool)
+    keeps_current[best_pair_rows[pair_labels[best] == labels[best_pair_rows]]] = True
+
+    moves = ~keeps_current[best_rows] & (new_labels != labels[best_rows])
+    changed = best_rows[moves]
+    labels[changed] = new_labels[moves]
+
+    return changed
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['numpy', 'compact_graph', 'compact_louvain', 'Optional', 'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -31,14 +31,12 @@ def louvain_algorithm(graph: Graph, adjacency_matrix: dict[int, dict[int, int]])
                                                             adjacency_matrix)
         # get modularity of new communities
 
-    # reassign community numbers - can ignore for larger values of vertices -> runtime
-
-    community_curr_values = set(communities.values())
+    # reassign community numbers in order of the first vertex of each community, so that the numbering only
+    # depends on the order of graph.vertices and is the same on every run
     old_to_new = {}
-    i = 0
-    for value in community_curr_values:
-        old_to_new[value] = i
-        i += 1
+    for value in communities.values():
+        if value not in old_to_new:
+            old_to_new[value] = len(old_to_new)
 
     for key in communities:
         communities[key] = old_to_new[communities[key]]
@@ -79,16 +77,33 @@ def graph_to_weighted_graph(graph: Graph) -> WeightedGraph:
     """
     This function converts graph to a weighted graph. In the new graph, the edge weight is always one.
 
+    Each undirected edge is added once, from the endpoint that is visited first.
+
     Preconditions:
         - graph is a valid graph
+
+    >>> g = Graph()
+    >>> for i in range(1, 4):
+    ...     g.add_vertex(i)
+    >>> g.add_edge(1, 2)
+    >>> g.add_edge(2, 3)
+    >>> wg = graph_to_weighted_graph(g)
+    >>> wg.get_all_edge_weights()
+    2
+    >>> wg.get_weight(2, 1)
+    1
     """
     wg = WeightedGraph()
 
     for v in graph.vertices.values():
         wg.add_vertex(v.item)
+
+    visited = set()
+    for v in graph.vertices.values():
         for u in v.neighbours:
-            wg.add_vertex(u.item)
-            wg.add_edge(u.item, v.item)
+            if u.item not in visited:
+                wg.add_edge(u.item, v.item)
+        visited.add(v.item)
 
     return wg
 
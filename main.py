@@ -23,8 +23,8 @@ the_communities, modularity = louvain_algorithm(graph, adjacent_matrix)
 # create new_communities such that the keys are integers value instead of _Vertex instances
 new_communities = {i.item: the_communities[i] for i in the_communities}
 
-# sort the new communities such that the dictionary is ordered -> needed for creating weighted graph
-sorted(new_communities.items(), key=lambda x: x[1])
+# sort the new communities by community id so that every later step visits them in the same order
+new_communities = dict(sorted(new_communities.items(), key=lambda x: x[1]))
 
 # transform graph to weighted graph for louvain algorithm iteration
 louvain_graph = graph_to_weighted_graph(graph)
@@ -72,4 +72,4 @@ for community in the_communities:
 for vertex in graph.vertices:
     graph.vertices[vertex].item = all_data_vertices[vertex]
 
-graph.make_community_graph(vertex_to_community, len(the_communities))
+graph.make_community_graph(vertex_to_community, len(set(vertex_to_community.values())))
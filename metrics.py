@@ -0,0 +1,139 @@
+"""
+This module contains the community quality metrics computed after a run, beyond the single modularity score.
+
+All per-community statistics are computed together in one vectorized pass over the edge arrays of a
+CompactGraph and the final partition, and returned as one table (a NumPy structured array with one row per
+community), which can be written to a .csv file for the dashboards.
+
+The columns of the table are:
+    - community: the community id used in the partition
+    - size: the number of vertices in the community
+    - internal_weight: the total weight of the edges inside the community
+    - cut: the total weight of the edges between the community and the rest of the graph
+    - volume: the total strength of the vertices in the community (out + in strength when directed)
+    - conductance: cut / min(volume, 2m - volume), 0 when that is 0
+    - density: internal_weight divided by the number of possible edges inside the community
+    - external_ratio: cut / internal_weight (inter to intra edge ratio), inf when only the cut is
+    non-zero
+    - modularity: the contribution of the community to the modularity, so the column sums to the modularity
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import csv
+import numpy as np
+from compact_graph import CompactGraph
+
+METRIC_COLUMNS = [('community', np.int64), ('size', np.int64), ('internal_weight', np.float64),
+                  ('cut', np.float64), ('volume', np.float64), ('conductance', np.float64),
+                  ('density', np.float64), ('external_ratio', np.float64), ('modularity', np.float64)]
+
+
+def community_metrics(graph: CompactGraph, labels: np.ndarray, resolution: float = 1.0) -> np.ndarray:
+    """
+    Return the table of metrics of every community of the partition where vertex i is in community labels[i],
+    with one row per community in increasing order of community id.
+
+    Preconditions:
+        - len(labels) == graph.num_vertices
+
+    >>> g = CompactGraph(4, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> table = community_metrics(g, np.array([5, 5, 5, 7]))
+    >>> table['community'].tolist(), table['size'].tolist(), table['internal_weight'].tolist()
+    ([5, 7], [3, 1], [3.0, 0.0])
+    >>> table['cut'].tolist(), table['conductance'].tolist(), table['density'].tolist()
+    ([1.0, 1.0], [1.0, 1.0], [1.0, 0.0])
+    >>> float(table['modularity'].sum())
+    -0.03125
+    """
+    communities, labels = np.unique(np.asarray(labels), return_inverse=True)
+    k = communities.shape[0]
+    m = graph.total_weight
+    weights = graph.weights.astype(np.float64)
+
+    src_comm, dst_comm = labels[graph.src], labels[graph.dst]
+    same = src_comm == dst_comm
+    internal = np.bincount(src_comm[same], weights=weights[same], minlength=k)
+    cut = np.bincount(src_comm[~same], weights=weights[~same], minlength=k) + \
+        np.bincount(dst_comm[~same], weights=weights[~same], minlength=k)
+
+    size = np.bincount(labels, minlength=k)
+    out_volume = np.bincount(labels, weights=graph.out_strength, minlength=k)
+    if graph.directed:
+        in_volume = np.bincount(labels, weights=graph.in_strength, minlength=k)
+        volume = out_volume + in_volume
+        pairs = size * (size - 1.0)
+        expected = out_volume * in_volume / (m * m) if m > 0 else np.zeros(k)
+    else:
+        volume = out_volume
+        pairs = size * (size - 1.0) / 2
+        expected = (volume / (2 * m)) ** 2 if m > 0 else np.zeros(k)
+
+    table = np.zeros(k, dtype=METRIC_COLUMNS)
+    table['community'] = communities
+    table['size'] = size
+    table['internal_weight'] = internal
+    table['cut'] = cut
+    table['volume'] = volume
+    table['conductance'] = _safe_divide(cut, np.minimum(volume, 2 * m - volume), 0.0)
+    table['density'] = _safe_divide(internal, pairs, 0.0)
+    table['external_ratio'] = np.where(cut > 0, _safe_divide(cut, internal, np.inf), 0.0)
+    table['modularity'] = (internal / m if m > 0 else 0.0) - resolution * expected
+
+    return table
+
+
+def partition_summary(graph: CompactGraph, table: np.ndarray) -> dict[str, float]:
+    """
+    Return the whole-partition numbers that follow from the metrics table of graph: the number of
+    communities, the modularity, the coverage (the fraction of the edge weight inside communities) and the
+    mean conductance.
+
+    >>> g = CompactGraph(4, np.array([0, 0, 1, 2]), np.array([1, 2, 2, 3]))
+    >>> partition_summary(g, community_metrics(g, np.array([0, 0, 0, 1])))
+    {'communities': 2, 'modularity': -0.03125, 'coverage': 0.75, 'mean_conductance': 1.0}
+    """
+    m = graph.total_weight
+
+    return {'communities': int(table.shape[0]),
+            'modularity': float(table['modularity'].sum()),
+            'coverage': float(table['internal_weight'].sum() / m) if m > 0 else 0.0,
+            'mean_conductance': float(table['conductance'].mean()) if table.shape[0] else 0.0}
+
+
+def write_metrics_csv(table: np.ndarray, path: str) -> None:
+    """
+    Write the metrics table to the .csv file at path, with a header row of column names.
+
+    Preconditions:
+        - path is a writable file path
+    """
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(table.dtype.names)
+        writer.writerows(row.tolist() for row in table)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray, default: float) -> np.ndarray:
+    """Return numerator / denominator element-wise, using default where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.broadcast_to(np.asarray(denominator, dtype=np.float64), numerator.shape)
+    result = np.full(numerator.shape, default)
+    nonzero = denominator != 0
+    result[nonzero] = numerator[nonzero] / denominator[nonzero]
+
+    return result
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'numpy', 'compact_graph', 'annotations'],
+        'allowed-io': ['write_metrics_csv'],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,364 @@
+"""
+This module contains the out-of-core mode, used for graphs whose edges do not fit in memory.
+
+The edges file is parsed in chunks and written to memory-mapped files in a working directory, so only one
+chunk of edges is ever held in memory. The CSR adjacency is filled in on disk from those files, the first
+level of the Louvain algorithm moves vertices one block of rows at a time, and the first aggregation is
+computed by streaming the edge chunks. Only the coarsened graph, which has one vertex per community, is
+loaded into memory as a CompactGraph and finished with compact_louvain.louvain.
+
+Repeated edges are not merged on disk; they behave as one edge with their total weight, as in CompactGraph.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import os
+from itertools import islice
+from typing import Iterator, Optional
+import numpy as np
+from compact_graph import CompactGraph
+from compact_louvain import best_community, canonical_labels, community_links, louvain, modularity
+from edge_ingest import SELF_LOOP_POLICIES, canonical_edges, parse_edge_lines
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+class OutOfCoreGraph:
+    """
+    A weighted, optionally directed graph whose edge arrays live in memory-mapped files.
+
+    The per-vertex arrays (items, indptr and the strengths) are kept in memory; the per-edge arrays are
+    np.memmap objects backed by files in directory.
+
+    Instance Attributes:
+        - directory: the working directory holding the memory-mapped files
+        - items: items[i] is the original item of vertex i
+        - directed: whether the edges are directed
+        - src, dst, weights: the edges in file order, using vertex indices
+        - indptr, indices, data: the CSR adjacency, as in CompactGraph
+        - in_indptr, in_indices, in_data: the CSR in-adjacency (the same arrays as above when undirected)
+        - out_strength, in_strength, total_weight: as in CompactGraph
+
+    Representation Invariants:
+        - self.items.shape[0] == self.indptr.shape[0] - 1
+    """
+    directory: str
+    items: np.ndarray
+    directed: bool
+    src: np.ndarray
+    dst: np.ndarray
+    weights: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    in_indptr: np.ndarray
+    in_indices: np.ndarray
+    in_data: np.ndarray
+    out_strength: np.ndarray
+    in_strength: np.ndarray
+    total_weight: float
+
+    def __init__(self, items: np.ndarray, edges: str, directory: str, weighted: bool = False,
+                 directed: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE, self_loops: str = 'drop') -> None:
+        """
+        Initialize the graph over the given items from the edges file, writing its edge arrays to directory.
+
+        Edges with an endpoint that is not in items are skipped, and so are self-loops unless self_loops is
+        'keep', as in pre_processing.get_compact_graph.
+
+        Raise a ValueError if self_loops is not in SELF_LOOP_POLICIES.
+
+        Preconditions:
+            - len(set(items)) == len(items)
+            - edges is a valid path to a .txt file
+            - chunk_size > 0
+        """
+        if self_loops not in SELF_LOOP_POLICIES:
+            raise ValueError(f'self_loops must be one of {SELF_LOOP_POLICIES}, got {self_loops!r}')
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.items = np.asarray(items)
+        self.directed = directed
+        n = self.items.shape[0]
+
+        num_edges = self._write_edge_files(edges, weighted, chunk_size, self_loops == 'keep')
+        self.src = self._open('src', np.int64, num_edges)
+        self.dst = self._open('dst', np.int64, num_edges)
+        self.weights = self._open('weights', np.float64, num_edges)
+
+        self.out_strength = np.zeros(n)
+        self.in_strength = np.zeros(n)
+        self.total_weight = 0.0
+        for src, dst, weights in self.edge_chunks(chunk_size):
+            self.out_strength += np.bincount(src, weights=weights, minlength=n)
+            self.in_strength += np.bincount(dst, weights=weights, minlength=n)
+            self.total_weight += float(weights.sum())
+
+        if directed:
+            self.indptr, self.indices, self.data = self._build_csr('out', chunk_size, reverse=False)
+            self.in_indptr, self.in_indices, self.in_data = self._build_csr('in', chunk_size, reverse=True)
+        else:
+            self.out_strength = self.out_strength + self.in_strength
+            self.in_strength = self.out_strength
+            self.indptr, self.indices, self.data = self._build_csr('adj', chunk_size, reverse=None)
+            self.in_indptr, self.in_indices, self.in_data = self.indptr, self.indices, self.data
+
+    @property
+    def num_vertices(self) -> int:
+        """Return the number of vertices in this graph."""
+        return self.items.shape[0]
+
+    @property
+    def num_edges(self) -> int:
+        """Return the number of edge rows in this graph, counting repeated edges separately."""
+        return self.src.shape[0]
+
+    def edge_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple[np.ndarray, np.ndarray,
+                                                                                   np.ndarray]]:
+        """
+        Yield the (src, dst, weights) edge arrays in chunks of at most chunk_size edges, read from disk.
+        """
+        for start in range(0, self.num_edges, chunk_size):
+            end = min(start + chunk_size, self.num_edges)
+            yield np.asarray(self.src[start:end]), np.asarray(self.dst[start:end]), \
+                np.asarray(self.weights[start:end])
+
+    def _path(self, name: str) -> str:
+        """Return the path of the memory-mapped file with the given name."""
+        return os.path.join(self.directory, name + '.bin')
+
+    def _open(self, name: str, dtype: type, length: int, mode: str = 'r') -> np.ndarray:
+        """Return the memory-mapped array with the given name, or an empty array when length is 0."""
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+
+        return np.memmap(self._path(name), dtype=dtype, mode=mode, shape=(length,))
+
+    def _write_edge_files(self, edges: str, weighted: bool, chunk_size: int, keep_self_loops: bool) -> int:
+        """
+        Parse the edges file in chunks of chunk_size lines, append the edges to the src, dst and weights files
+        and return the number of edges written.
+        """
+        order = np.argsort(self.items, kind='stable')
+        sorted_items = self.items[order]
+        num_edges = 0
+
+        with open(edges, mode='r', encoding='cp437') as file, open(self._path('src'), 'wb') as src_file, \
+                open(self._path('dst'), 'wb') as dst_file, open(self._path('weights'), 'wb') as weight_file:
+            while True:
+                lines = list(islice(file, chunk_size))
+                if not lines:
+                    break
+
+                chunk = parse_edge_lines(lines, weighted)
+                src, dst = chunk['u'], chunk['v']
+                weights = chunk['w'] if weighted else np.ones(src.shape[0])
+
+                src_pos = np.minimum(np.searchsorted(sorted_items, src), len(sorted_items) - 1)
+                dst_pos = np.minimum(np.searchsorted(sorted_items, dst), len(sorted_items) - 1)
+                known = (sorted_items[src_pos] == src) & (sorted_items[dst_pos] == dst)
+                if not keep_self_loops:
+                    known &= src != dst
+
+                order[src_pos[known]].tofile(src_file)
+                order[dst_pos[known]].tofile(dst_file)
+                weights[known].tofile(weight_file)
+                num_edges += int(known.sum())
+
+        return num_edges
+
+    def _build_csr(self, name: str, chunk_size: int, reverse: Optional[bool]) -> (np.ndarray, np.ndarray,
+                                                                                    np.ndarray):
+        """
+        Return the (indptr, indices, data) CSR arrays of the edges, with indices and data memory-mapped.
+
+        Rows are the sources of the edges, or their targets if reverse is True. If reverse is None, both
+        directions of every edge except self-loops are added, as for an undirected graph.
+        """
+        n = self.num_vertices
+        counts = np.zeros(n, dtype=np.int64)
+        for rows, _, _ in self._csr_entries(chunk_size, reverse):
+            counts += np.bincount(rows, minlength=n)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        indices = self._open(name + '_indices', np.int64, int(indptr[-1]), mode='w+')
+        data = self._open(name + '_data', np.float64, int(indptr[-1]), mode='w+')
+
+        cursor = indptr[:-1].copy()
+        for rows, cols, values in self._csr_entries(chunk_size, reverse):
+            order = np.argsort(rows, kind='stable')
+            rows, cols, values = rows[order], cols[order], values[order]
+            chunk_counts = np.bincount(rows, minlength=n)
+            rank = np.arange(rows.shape[0]) - (np.cumsum(chunk_counts) - chunk_counts)[rows]
+            positions = cursor[rows] + rank
+            indices[positions] = cols
+            data[positions] = values
+            cursor += chunk_counts
+
+        if isinstance(indices, np.memmap):
+            indices.flush()
+            data.flush()
+
+        return indptr, indices, data
+
+    def _csr_entries(self, chunk_size: int, reverse: Optional[bool]) -> Iterator[tuple[np.ndarray, np.ndarray,
+                                                                                        np.ndarray]]:
+        """Yield the (rows, cols, values) entries of the CSR adjacency described in _build_csr, in chunks."""
+        for src, dst, weights in self.edge_chunks(chunk_size):
+            if reverse is None:
+                loops = src == dst
+                yield (np.concatenate((src, dst[~loops])), np.concatenate((dst, src[~loops])),
+                       np.concatenate((weights, weights[~loops])))
+            elif reverse:
+                yield dst, src, weights
+            else:
+                yield src, dst, weights
+
+
+def streaming_local_move(graph: OutOfCoreGraph, labels: np.ndarray, resolution: float = 1.0,
+                         block_edges: int = DEFAULT_CHUNK_SIZE, max_sweeps: int = 100) -> (np.ndarray, int):
+    """
+    Return the labels after the local moving phase of the Louvain algorithm on graph, together with the number
+    of moves made.
+
+    This is compact_louvain.local_move, except that the adjacency of only one block of consecutive vertices,
+    holding about block_edges CSR entries, is read from disk at a time.
+
+    Preconditions:
+        - len(labels) == graph.num_vertices
+        - all(0 <= label < graph.num_vertices for label in labels)
+        - block_edges > 0
+    """
+    labels = np.array(labels, dtype=np.int64)
+    m = graph.total_weight
+    if m == 0:
+        return labels, 0
+
+    n = graph.num_vertices
+    lab = labels.tolist()
+    k_out = graph.out_strength.tolist()
+    k_in = graph.in_strength.tolist()
+    tot_out = np.bincount(labels, weights=graph.out_strength, minlength=n).tolist()
+    tot_in = np.bincount(labels, weights=graph.in_strength, minlength=n).tolist() if graph.directed else tot_out
+    csr_arrays = [(graph.indptr, graph.indices, graph.data)]
+    if graph.directed:
+        csr_arrays.append((graph.in_indptr, graph.in_indices, graph.in_data))
+
+    moves = 0
+    sweeps = 0
+    moved = True
+    while moved and sweeps < max_sweeps:
+        moved = False
+        sweeps += 1
+        for start, end in row_blocks(graph.indptr, block_edges):
+            adjacency = [_load_block(indptr, indices, data, start, end) for indptr, indices, data in csr_arrays]
+            for v in range(start, end):
+                links = community_links(v, lab, adjacency, offset=start)
+                best = best_community(v, lab[v], links, k_out[v], k_in[v], tot_out, tot_in, m, resolution,
+                                       graph.directed)
+                if best != lab[v]:
+                    lab[v] = best
+                    moves += 1
+                    moved = True
+
+    return np.array(lab, dtype=np.int64), moves
+
+
+def row_blocks(indptr: np.ndarray, block_edges: int) -> Iterator[tuple[int, int]]:
+    """
+    Yield the (start, end) vertex ranges covering all vertices, each holding about block_edges CSR entries
+    and at least one vertex.
+
+    >>> list(row_blocks(np.array([0, 2, 3, 3, 7]), 3))
+    [(0, 3), (3, 4)]
+    """
+    n = indptr.shape[0] - 1
+    start = 0
+    while start < n:
+        end = int(np.searchsorted(indptr, indptr[start] + block_edges, side='right')) - 1
+        end = min(max(end, start + 1), n)
+        yield start, end
+        start = end
+
+
+def _load_block(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, start: int,
+                end: int) -> tuple[list, list, list]:
+    """Return the in-memory adjacency lists of the vertices start to end - 1, with row offsets from start."""
+    first, last = int(indptr[start]), int(indptr[end])
+
+    return (indptr[start:end + 1] - first).tolist(), np.asarray(indices[first:last]).tolist(), \
+        np.asarray(data[first:last]).tolist()
+
+
+def streaming_aggregate(graph: OutOfCoreGraph, labels: np.ndarray,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> CompactGraph:
+    """
+    Return the in-memory graph with one vertex per community of graph, computed one chunk of edges at a time.
+
+    The edges of each chunk are relabelled by community and merged within the chunk, and the merged chunks
+    are only merged with each other once, by CompactGraph, at the end. Every edge is therefore sorted once,
+    and memory is bounded by the coarse edges of each chunk, which are far fewer than the edges of the chunk
+    once the communities are found.
+
+    Preconditions:
+        - labels are the contiguous community ids 0 to k - 1 of the vertices of graph
+    """
+    num_communities = int(labels.max()) + 1 if labels.shape[0] else 0
+    src_parts, dst_parts, weight_parts = [], [], []
+
+    for chunk_src, chunk_dst, chunk_weights in graph.edge_chunks(chunk_size):
+        src, dst, weights = canonical_edges(labels[chunk_src], labels[chunk_dst], chunk_weights, accumulate=True,
+                                            self_loops='keep', directed=graph.directed)
+        src_parts.append(src)
+        dst_parts.append(dst)
+        weight_parts.append(weights)
+
+    if not src_parts:
+        return CompactGraph(num_communities, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                            np.empty(0), graph.directed)
+
+    return CompactGraph(num_communities, np.concatenate(src_parts), np.concatenate(dst_parts),
+                        np.concatenate(weight_parts), graph.directed)
+
+
+def out_of_core_louvain(graph: OutOfCoreGraph, resolution: float = 1.0, min_gain: float = 1e-7,
+                        block_edges: int = DEFAULT_CHUNK_SIZE,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> (list[np.ndarray], float):
+    """
+    Run the Louvain algorithm on graph and return the list of levels and the final modularity, in the same
+    form as compact_louvain.louvain.
+
+    The first level is computed with streaming_local_move and streaming_aggregate; every later level runs in
+    memory on the coarsened graph.
+
+    Preconditions:
+        - graph.num_vertices > 0
+    """
+    labels, _ = streaming_local_move(graph, np.arange(graph.num_vertices), resolution, block_edges)
+    labels = canonical_labels(labels)
+    coarse = streaming_aggregate(graph, labels, chunk_size)
+    first_q = modularity(coarse, np.arange(coarse.num_vertices), resolution)
+
+    levels, q = louvain(coarse, resolution, min_gain)
+    if levels[-1].max() + 1 == coarse.num_vertices:
+        # the coarse graph could not be merged further
+        return [labels], first_q
+
+    return [labels] + [level[labels] for level in levels], q
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['os', 'itertools', 'numpy', 'compact_graph', 'compact_louvain', 'edge_ingest',
+                          'Iterator', 'Optional', 'annotations'],
+        'allowed-io': ['OutOfCoreGraph._write_edge_files'],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
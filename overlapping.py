@@ -0,0 +1,220 @@
+"""
+This module contains overlapping community detection on the compact graph, where a vertex (e.g. a chef's page
+linking to several restaurant groups) can be in more than one community.
+
+Communities are grown from seed vertices by local fitness expansion (Lancichinetti, Fortunato and Kertesz,
+2009). The fitness of a set of vertices S is
+
+    f(S) = k_in / (k_in + k_out) ** alpha
+
+where k_in is twice the weight of the edges inside S and k_out the weight of the edges leaving S. Starting
+from the seed, the neighbour whose addition gives the largest fitness is added, and then every member whose
+removal increases the fitness is removed, until no neighbour increases the fitness. Larger values of alpha
+give smaller communities.
+
+Seeds are taken in a random order among the vertices that are not in a community yet. Each round grows a
+batch of seeds at the same time in a pool of worker processes, so only the local neighbourhood of a seed is
+ever looked at and the work is spread over every CPU. The result is a sparse vertex by community membership
+matrix.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+import scipy.sparse
+from compact_graph import CompactGraph
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_SEEDS_PER_ROUND = 256
+
+# the graph and parameters used by _expand, set once in every worker process by _init_worker
+_WORKER = {}
+
+
+def overlapping_communities(graph: CompactGraph, alpha: float = 1.0, max_size: int = DEFAULT_MAX_SIZE,
+                            seeds_per_round: int = DEFAULT_SEEDS_PER_ROUND, workers: Optional[int] = None,
+                            seed: int = 0) -> scipy.sparse.csr_array:
+    """
+    Return the overlapping communities of graph found by local fitness expansion, as a sparse membership
+    matrix of shape (graph.num_vertices, number of communities) whose entry (i, c) is 1 when vertex i is in
+    community c and 0 otherwise.
+
+    Every vertex is in at least one community, and a community has at most max_size vertices. Communities
+    found from more than one seed are only kept once, and the communities are numbered in increasing order of
+    their sorted members, so the result only depends on graph, alpha, max_size, seeds_per_round and seed. The
+    edges of a directed graph are followed in both directions.
+
+    The seeds of a round are grown by a pool of worker processes (one per CPU if workers is None); workers=1
+    grows them in this process instead. Scripts using more than one worker must call this function from under
+    an if __name__ == '__main__' guard.
+
+    Preconditions:
+        - alpha > 0
+        - max_size > 0 and seeds_per_round > 0
+
+    >>> src = np.array([0, 0, 0, 1, 1, 2, 3, 3, 3, 4, 4, 5])
+    >>> dst = np.array([1, 2, 3, 2, 3, 3, 4, 5, 6, 5, 6, 6])
+    >>> membership = overlapping_communities(CompactGraph(7, src, dst), workers=1)
+    >>> membership.shape
+    (7, 2)
+    >>> [np.flatnonzero(column).tolist() for column in membership.T.toarray()]
+    [[0, 1, 2, 3], [3, 4, 5, 6]]
+    """
+    n = graph.num_vertices
+    order = np.random.default_rng(seed).permutation(n)
+    covered = np.zeros(n, dtype=bool)
+    communities = set()
+    worker_data = _worker_data(graph, alpha, max_size)
+
+    executor = None
+    if workers == 1:
+        _init_worker(*worker_data)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=worker_data)
+
+    try:
+        position = 0
+        while position < n:
+            batch = []
+            while position < n and len(batch) < seeds_per_round:
+                if not covered[order[position]]:
+                    batch.append(int(order[position]))
+                position += 1
+
+            if executor is None:
+                results = map(_expand, batch)
+            else:
+                results = executor.map(_expand, batch, chunksize=max(1, len(batch) // 64))
+            for members in results:
+                covered[list(members)] = True
+                communities.add(members)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return _membership_matrix(n, sorted(communities))
+
+
+def _worker_data(graph: CompactGraph, alpha: float, max_size: int) -> tuple:
+    """Return the arguments of _init_worker for growing communities of graph."""
+    loops = np.zeros(graph.num_vertices)
+    is_loop = graph.src == graph.dst
+    loops[graph.src[is_loop]] = graph.weights[is_loop]
+    adjacency = [(graph.indptr, graph.indices, graph.data)]
+    if graph.directed:
+        adjacency.append((graph.in_indptr, graph.in_indices, graph.in_data))
+        strength = graph.out_strength + graph.in_strength
+    else:
+        strength = graph.out_strength
+
+    return adjacency, strength, loops, alpha, max_size
+
+
+def _init_worker(adjacency: list[tuple[np.ndarray, np.ndarray, np.ndarray]], strength: np.ndarray,
+                 loops: np.ndarray, alpha: float, max_size: int) -> None:
+    """Keep the graph and parameters in this process, as Python lists for fast access by _expand."""
+    _WORKER['adjacency'] = [(indptr.tolist(), indices.tolist(), data.tolist()) for indptr, indices, data in adjacency]
+    _WORKER['strength'] = strength.tolist()
+    _WORKER['loops'] = loops.tolist()
+    _WORKER['alpha'] = alpha
+    _WORKER['max_size'] = max_size
+
+
+def _expand(seed_vertex: int) -> tuple[int, ...]:
+    """
+    Return the sorted members of the community grown from seed_vertex by local fitness expansion, using the
+    graph set by _init_worker.
+
+    The seed is never removed, so it is always in the returned community.
+    """
+    strength, loops, alpha = _WORKER['strength'], _WORKER['loops'], _WORKER['alpha']
+    if strength[seed_vertex] == 0:
+        return (seed_vertex,)
+
+    # links[v] is the weight of the edges between v and the members other than v
+    members = {seed_vertex}
+    links = {}
+    _update_links(seed_vertex, links, 1)
+    k_in, total = 2 * loops[seed_vertex], strength[seed_vertex]
+
+    while len(members) < _WORKER['max_size']:
+        added, best_fitness = None, _fitness(k_in, total, alpha)
+        for v, weight in links.items():
+            if v not in members:
+                fitness = _fitness(k_in + 2 * (weight + loops[v]), total + strength[v], alpha)
+                if fitness > best_fitness:
+                    added, best_fitness = v, fitness
+        if added is None:
+            break
+
+        members.add(added)
+        k_in, total = k_in + 2 * (links[added] + loops[added]), total + strength[added]
+        _update_links(added, links, 1)
+
+        removed = _worst_member(members, links, k_in, total, {seed_vertex, added})
+        while removed is not None:
+            members.remove(removed)
+            k_in, total = k_in - 2 * (links[removed] + loops[removed]), total - strength[removed]
+            _update_links(removed, links, -1)
+            removed = _worst_member(members, links, k_in, total, {seed_vertex, added})
+
+    return tuple(sorted(members))
+
+
+def _worst_member(members: set[int], links: dict[int, float], k_in: float, total: float,
+                  kept: set[int]) -> Optional[int]:
+    """
+    Return the member not in kept whose removal increases the fitness of members the most, or None if no
+    removal increases it.
+    """
+    strength, loops, alpha = _WORKER['strength'], _WORKER['loops'], _WORKER['alpha']
+    worst, best_fitness = None, _fitness(k_in, total, alpha)
+    for u in members - kept:
+        fitness = _fitness(k_in - 2 * (links[u] + loops[u]), total - strength[u], alpha)
+        if fitness > best_fitness:
+            worst, best_fitness = u, fitness
+
+    return worst
+
+
+def _update_links(v: int, links: dict[int, float], sign: int) -> None:
+    """Add (sign == 1) or subtract (sign == -1) the weights of the edges of v to links, leaving out self-loops."""
+    if v not in links:
+        links[v] = 0
+    for indptr, indices, data in _WORKER['adjacency']:
+        for position in range(indptr[v], indptr[v + 1]):
+            u = indices[position]
+            if u != v:
+                links[u] = links.get(u, 0) + sign * data[position]
+
+
+def _fitness(k_in: float, total: float, alpha: float) -> float:
+    """Return the fitness of a set of vertices with the given k_in and total strength k_in + k_out."""
+    return k_in / total ** alpha if total > 0 else 0.0
+
+
+def _membership_matrix(n: int, communities: list[tuple[int, ...]]) -> scipy.sparse.csr_array:
+    """Return the n by len(communities) membership matrix of the given communities."""
+    sizes = [len(members) for members in communities]
+    rows = np.fromiter((v for members in communities for v in members), dtype=np.int64, count=sum(sizes))
+    columns = np.repeat(np.arange(len(communities), dtype=np.int64), sizes)
+
+    return scipy.sparse.csr_array((np.ones(rows.shape[0], dtype=np.int32), (rows, columns)),
+                                  shape=(n, len(communities)))
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['concurrent.futures', 'numpy', 'scipy.sparse', 'compact_graph', 'Optional',
+                          'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
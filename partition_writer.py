@@ -0,0 +1,114 @@
+"""
+This module contains the output stage that writes a partition for downstream consumers.
+
+Once the final level of a run is known, the vertices file is read again in batches (in a background thread,
+by io_pipeline.BatchReader) and every batch is written straight out as rows of the original id, the page id
+(the first column of the vertices file), the name and the community of the vertex at every level. The
+communities are looked up in the level arrays with NumPy, so no dictionary keyed by name or id is built and
+memory stays bounded by a few batches, whatever the number of vertices.
+
+Two file formats are supported:
+    - 'csv': a header row id,page_id,name,level_0,level_1,... and then one row per vertex
+    - 'jsonl': one JSON object per line with the same keys as the CSV header
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import csv
+import json
+from typing import Iterator
+import numpy as np
+from compact_graph import CompactGraph
+from io_pipeline import BatchReader, parse_vertex_lines
+
+PARTITION_FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 100_000
+
+
+def partition_batches(vertices: str, graph: CompactGraph, levels: list[np.ndarray],
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[tuple]]:
+    """
+    Yield the rows of the partition output in batches of at most batch_size rows, in the order of the vertices
+    file. Each row is (id, page id, name, community at level 0, community at level 1, ...).
+
+    levels[k][i] is the community of vertex i of graph at level k, as returned by compact_louvain.louvain.
+    The names are the names in the file, without the identifiers added to repeated names by read_vertices.
+
+    Raise a ValueError if an id in vertices is not in graph.items (e.g. when graph is a subgraph, or was built
+    from another vertices file), rather than writing the community of another vertex for it.
+
+    Preconditions:
+        - vertices is a valid path to a .txt file
+        - all(len(level) == graph.num_vertices for level in levels)
+
+    >>> from pre_processing import get_compact_graph
+    >>> g, _ = get_compact_graph('test_nodes.txt', 'test_edges.txt')
+    >>> batches = list(partition_batches('test_nodes.txt', g, [np.arange(17), np.zeros(17, dtype=int)], 10))
+    >>> [len(batch) for batch in batches], batches[0][0]
+    ([10, 7], (11419, 155624991258330, 'JJ Rosa', 0, 0))
+    >>> list(partition_batches('test_nodes.txt', CompactGraph(1, np.array([0]), np.array([0])), [np.zeros(1)]))
+    Traceback (most recent call last):
+    ...
+    ValueError: vertex 11419 of test_nodes.txt is not in graph.items
+    """
+    order = np.argsort(graph.items, kind='stable')
+    sorted_items = graph.items[order]
+
+    # the reader is closed even if the consumer stops before the last batch
+    with BatchReader(vertices, parse_vertex_lines, batch_size) as reader:
+        for rows in reader:
+            ids = np.array([int(row[2]) for row in rows], dtype=np.int64)
+            positions = np.searchsorted(sorted_items, ids)
+            found = positions < sorted_items.shape[0]
+            found[found] = sorted_items[positions[found]] == ids[found]
+            if not found.all():
+                raise ValueError(f'vertex {ids[~found][0]} of {vertices} is not in graph.items')
+            indices = order[positions]
+            columns = [ids.tolist(), [int(row[0]) for row in rows], [row[1] for row in rows]]
+            columns.extend(level[indices].tolist() for level in levels)
+
+            yield list(zip(*columns))
+
+
+def write_partition(vertices: str, graph: CompactGraph, levels: list[np.ndarray], path: str,
+                    file_format: str = 'csv', batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    """
+    Write the id, page id, name and community at every level of each vertex to the file at path, in the
+    given format, batch_size rows at a time.
+
+    Raise a ValueError as partition_batches does if an id in vertices is not in graph.items; the rows of the
+    batches before it are already written.
+
+    Preconditions:
+        - file_format in PARTITION_FORMATS
+        - path is a writable file path
+        - the preconditions of partition_batches hold
+    """
+    if file_format not in PARTITION_FORMATS:
+        raise ValueError(f'file_format must be one of {PARTITION_FORMATS}, got {file_format!r}')
+
+    header = ['id', 'page_id', 'name'] + [f'level_{k}' for k in range(len(levels))]
+
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for batch in partition_batches(vertices, graph, levels, batch_size):
+                writer.writerows(batch)
+        else:
+            for batch in partition_batches(vertices, graph, levels, batch_size):
+                file.writelines(json.dumps(dict(zip(header, row)), ensure_ascii=False) + '\n' for row in batch)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'json', 'numpy', 'compact_graph', 'io_pipeline', 'Iterator', 'annotations'],
+        'allowed-io': ['write_partition'],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
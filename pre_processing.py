@@ -4,8 +4,13 @@ This module processes the data from the dataset files into a Graph object.
 Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
 """
 
+from typing import Iterable
 from classes import Graph
+from compact_graph import CompactGraph
+from out_of_core import OutOfCoreGraph, DEFAULT_CHUNK_SIZE
 import csv
+import numpy as np
+from edge_ingest import canonical_edges, filter_known_vertices, filter_self_loops, read_edge_arrays
 
 
 def get_graph(vertices: str, edges: str) -> (Graph, dict[str, str]):
@@ -13,33 +18,134 @@ def get_graph(vertices: str, edges: str) -> (Graph, dict[str, str]):
     Create graph from the files.
 
     vertices is the file of vertices/users in the social newtowrk.
-    edges is the file of edges, representing direct connections between users.
+    edges is the file of edges, representing direct connections between users. Repeated edges and
+    self-loops in the file are removed by the canonical edge-ingest stage, so every edge is added once. This
+    is the same graph as get_compact_graph builds with its default self_loops='drop'.
 
     Preconditions:
         - vertices and edges are valid paths to a .txt file
     """
-    identifier = 0  # identifier for duplicates, value does not matter, just to distinguish nodes
     g = Graph()
-    all_data_vertices = {}
+    all_data_vertices = read_vertices(vertices)
+    for item in all_data_vertices:
+        g.add_vertex(item)
+
+    src, dst, _ = read_edge_arrays(edges)
+    src, dst, _ = filter_known_vertices(src, dst, np.fromiter(all_data_vertices, dtype=np.int64))
+    src, dst, _ = canonical_edges(src, dst, self_loops='drop')
+    for item1, item2 in zip(src.tolist(), dst.tolist()):
+        g.add_edge(item1, item2)
+
+    return g, all_data_vertices
+
+
+def get_compact_graph(vertices: str, edges: str, weighted: bool = False, directed: bool = False,
+                      self_loops: str = 'drop') -> (CompactGraph, dict[int, str]):
+    """
+    Create a compact graph from the files, without building a _Vertex object per vertex.
+
+    edges may have a third column holding the edge weight (e.g. a message or share count), which is read when
+    weighted is True; otherwise every edge has weight 1. Repeated edges are merged into one edge whose weight
+    is their total weight. If directed is True, an edge goes from the first to the second column.
+
+    self_loops is either 'drop', which removes the self-loops in the file like get_graph does, or 'keep',
+    which counts them in the strengths and total weight as in the modularity definition (see edge_ingest).
+
+    Vertex i of the returned graph is the i-th vertex of the vertices file, so graph.items[i] is its node id.
+
+    Preconditions:
+        - vertices and edges are valid paths to a .txt file
+
+    >>> g, names = get_compact_graph('test_nodes.txt', 'test_edges.txt')
+    >>> g.num_vertices, g.num_edges, g.total_weight
+    (17, 27, 27.0)
+    """
+    all_data_vertices = read_vertices(vertices)
+    items = np.fromiter(all_data_vertices, dtype=np.int64, count=len(all_data_vertices))
+
+    src, dst, weights = read_edge_arrays(edges, weighted)
+    src, dst, weights = filter_known_vertices(src, dst, items, weights)
+    src, dst, weights = filter_self_loops(src, dst, self_loops, weights)
+
+    return CompactGraph.from_item_edges(items, src, dst, weights, directed), all_data_vertices
+
+
+def get_out_of_core_graph(vertices: str, edges: str, directory: str, weighted: bool = False,
+                          directed: bool = False, self_loops: str = 'drop',
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> (OutOfCoreGraph, dict[int, str]):
+    """
+    Create an out-of-core graph from the files, for graphs whose edges do not fit in memory.
+
+    The edges file is read chunk_size lines at a time and its edge arrays are written to memory-mapped files
+    in directory. weighted, directed and self_loops have the same meaning as in get_compact_graph.
+    graph_stats.streaming_summary of the result gives the size, degrees and components of the dataset without
+    loading its edges into memory.
+
+    Preconditions:
+        - vertices and edges are valid paths to a .txt file
+        - directory is a writable directory path (it is created if it does not exist)
+    """
+    all_data_vertices = read_vertices(vertices)
+    items = np.fromiter(all_data_vertices, dtype=np.int64, count=len(all_data_vertices))
+
+    return OutOfCoreGraph(items, edges, directory, weighted, directed, chunk_size, self_loops), all_data_vertices
+
+
+def read_vertices(vertices: str) -> dict[int, str]:
+    """
+    Return a dictionary mapping the id of each vertex in the vertices file to the name of the restaurant.
+
+    Names that appear more than once are made unique by adding an identifier to the end.
+
+    Preconditions:
+        - vertices is a valid path to a .txt file
+    """
+    vertex_names = VertexNames()
     with open(vertices, mode='r', encoding='cp437') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if row[1] in all_data_vertices.values():
-                all_data_vertices[int(row[2])] = row[1] + str(identifier)
-                identifier += 1
-            else:
-                all_data_vertices[int(row[2])] = row[1]
+        vertex_names.add_rows(csv.reader(file))
 
-            g.add_vertex(int(row[2]))
+    return vertex_names.names
 
-    with open(edges, mode='r', encoding='cp437') as file:
-        reader = csv.reader(file)
-        valid_vertices = [key for key in all_data_vertices]
-        for row in reader:
-            if all(int(vertex) in valid_vertices for vertex in row):
-                g.add_edge(int(row[0]), int(row[1]))
 
-    return g, all_data_vertices
+class VertexNames:
+    """
+    The dictionary mapping the id of each vertex to a unique restaurant name, built from rows of the vertices
+    file. Rows can be added in several batches, as long as the batches are added in file order.
+
+    Instance Attributes:
+        - names: the id of every vertex added so far mapped to its unique name
+
+    >>> vertex_names = VertexNames()
+    >>> vertex_names.add_rows([['1', 'Cafe', '10'], ['2', 'Bar', '20']])
+    >>> vertex_names.add_rows([['3', 'Cafe', '30']])
+    >>> vertex_names.names
+    {10: 'Cafe', 20: 'Bar', 30: 'Cafe0'}
+    """
+    names: dict[int, str]
+    _used_names: set[str]
+    _identifier: int
+
+    def __init__(self) -> None:
+        """Initialize an empty dictionary of vertex names."""
+        self.names = {}
+        self._used_names = set()
+        self._identifier = 0  # identifier for duplicates, value does not matter, just to distinguish nodes
+
+    def add_rows(self, rows: Iterable[list[str]]) -> None:
+        """
+        Add the vertices in the given rows of the vertices file.
+
+        Names that appear more than once are made unique by adding an identifier to the end.
+        """
+        for row in rows:
+            if row[1] in self._used_names:
+                name = row[1] + str(self._identifier)
+                self._identifier += 1
+            else:
+                name = row[1]
+
+            self.names[int(row[2])] = name
+            self._used_names.add(name)
 
 
 if __name__ == '__main__':
@@ -49,7 +155,8 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-io': [],
+        'extra-imports': ['csv', 'numpy', 'classes', 'compact_graph', 'out_of_core', 'edge_ingest', 'Iterable'],
+        'allowed-io': ['read_vertices'],
         'max-line-length': 120,
         'max-nested-blocks': 4
     })
@@ -0,0 +1,163 @@
+"""
+This module contains subgraph extraction on the compact graph and recursive, per-community detection.
+
+Analysts can take the subgraph induced by one community (or any set of vertices) straight from the
+CompactGraph already in memory, without writing a new nodes/edges file pair, and the large communities of a
+partition can be split again by running the Louvain algorithm on their subgraphs in parallel worker
+processes. Repeating this gives hierarchical sub-community output.
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+from compact_graph import CompactGraph
+from compact_louvain import canonical_labels, louvain
+
+DEFAULT_MIN_SIZE = 1000
+
+
+def induced_subgraph(graph: CompactGraph, vertices: np.ndarray) -> CompactGraph:
+    """
+    Return the subgraph of graph induced by the given vertex indices, where vertex i of the subgraph is
+    vertices[i] of graph and keeps its item.
+
+    If vertices is a contiguous, increasing range of indices, the items of the subgraph are a view into the
+    items of graph rather than a copy, and only the edges starting in that range are scanned (the canonical
+    edges are sorted by src). Otherwise every edge is checked once.
+
+    Preconditions:
+        - len(set(vertices)) == len(vertices)
+        - all(0 <= v < graph.num_vertices for v in vertices)
+
+    >>> g = CompactGraph(5, np.array([0, 0, 1, 2, 3]), np.array([1, 2, 2, 3, 4]))
+    >>> sub = induced_subgraph(g, np.array([1, 2, 3]))
+    >>> sub.items.tolist(), sub.src.tolist(), sub.dst.tolist()
+    ([1, 2, 3], [0, 1], [1, 2])
+    >>> np.shares_memory(sub.items, g.items)
+    True
+    >>> induced_subgraph(g, np.array([3, 0, 2])).src.tolist()
+    [0, 1]
+    """
+    vertices = np.asarray(vertices, dtype=np.int64)
+    count = vertices.shape[0]
+
+    if count > 0 and vertices[-1] - vertices[0] == count - 1 and np.all(np.diff(vertices) == 1):
+        first = int(vertices[0])
+        items = graph.items[first:first + count]
+        start, end = np.searchsorted(graph.src, [first, first + count])
+        src, dst, weights = graph.src[start:end], graph.dst[start:end], graph.weights[start:end]
+        inside = (dst >= first) & (dst < first + count)
+
+        return CompactGraph(count, src[inside] - first, dst[inside] - first, weights[inside], graph.directed,
+                            items)
+
+    new_index = np.full(graph.num_vertices, -1, dtype=np.int64)
+    new_index[vertices] = np.arange(count)
+    src, dst = new_index[graph.src], new_index[graph.dst]
+    inside = (src >= 0) & (dst >= 0)
+
+    return CompactGraph(count, src[inside], dst[inside], graph.weights[inside], graph.directed,
+                        graph.items[vertices])
+
+
+def community_subgraph(graph: CompactGraph, labels: np.ndarray, community: int) -> (CompactGraph, np.ndarray):
+    """
+    Return the subgraph induced by the vertices in the given community of labels, together with the indices of
+    those vertices in graph.
+
+    >>> g = CompactGraph(5, np.array([0, 0, 1, 2, 3]), np.array([1, 2, 2, 3, 4]))
+    >>> sub, vertices = community_subgraph(g, np.array([0, 0, 0, 1, 1]), 1)
+    >>> vertices.tolist(), sub.num_edges
+    ([3, 4], 1)
+    """
+    vertices = np.flatnonzero(np.asarray(labels) == community)
+
+    return induced_subgraph(graph, vertices), vertices
+
+
+def recursive_louvain(graph: CompactGraph, labels: Optional[np.ndarray] = None, min_size: int = DEFAULT_MIN_SIZE,
+                      max_depth: int = 1, resolution: float = 1.0,
+                      workers: Optional[int] = None) -> list[np.ndarray]:
+    """
+    Return the community hierarchy of graph, found by running the Louvain algorithm again on the subgraph of
+    every community with at least min_size vertices, up to max_depth times.
+
+    hierarchy[0] is the starting partition (labels, or the final Louvain level of graph if labels is None) and
+    hierarchy[d][i] is the community of vertex i after d rounds of splitting. Every level is numbered by
+    canonical_labels, and a community that is too small or cannot be split keeps all its vertices together.
+    Results come back in a fixed order, so the hierarchy is the same for any number of workers.
+
+    The subgraphs of one round are detected in parallel by a pool of worker processes (one per CPU if workers
+    is None); workers=1 runs them in this process instead. Scripts using more than one worker must call this
+    function from under an if __name__ == '__main__' guard.
+
+    Preconditions:
+        - labels is None or len(labels) == graph.num_vertices
+        - min_size > 0 and max_depth >= 0
+
+    >>> g = CompactGraph(6, np.array([0, 0, 1, 3, 3, 4, 2]), np.array([1, 2, 2, 4, 5, 5, 3]))
+    >>> hierarchy = recursive_louvain(g, np.zeros(6, dtype=int), min_size=2, workers=1)
+    >>> [level.tolist() for level in hierarchy]
+    [[0, 0, 0, 0, 0, 0], [0, 0, 0, 1, 1, 1]]
+    """
+    if labels is None:
+        levels, _ = louvain(graph, resolution)
+        labels = levels[-1]
+    hierarchy = [canonical_labels(labels)]
+
+    for _ in range(max_depth):
+        parent = hierarchy[-1]
+        sizes = np.bincount(parent)
+        large = np.flatnonzero(sizes >= min_size)
+        if large.shape[0] == 0:
+            break
+
+        order = np.argsort(parent, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(sizes)))
+        members = [order[starts[c]:starts[c + 1]] for c in large]
+        subgraphs = [induced_subgraph(graph, vertices) for vertices in members]
+
+        sub_labels = np.zeros(graph.num_vertices, dtype=np.int64)
+        for vertices, split in zip(members, _detect_all(subgraphs, resolution, workers)):
+            sub_labels[vertices] = split
+
+        pairs = np.unique(np.column_stack((parent, sub_labels)), axis=0, return_inverse=True)[1]
+        child = canonical_labels(pairs.reshape(-1))
+        if child.max() == parent.max():
+            break
+        hierarchy.append(child)
+
+    return hierarchy
+
+
+def _detect_all(subgraphs: list[CompactGraph], resolution: float, workers: Optional[int]) -> list[np.ndarray]:
+    """Return the final Louvain partition of each subgraph, in the same order as subgraphs."""
+    if workers == 1 or len(subgraphs) == 1:
+        return [_detect(subgraph, resolution) for subgraph in subgraphs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_detect, subgraphs, [resolution] * len(subgraphs)))
+
+
+def _detect(subgraph: CompactGraph, resolution: float) -> np.ndarray:
+    """Return the final Louvain partition of subgraph."""
+    levels, _ = louvain(subgraph, resolution)
+
+    return levels[-1]
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['concurrent.futures', 'numpy', 'compact_graph', 'compact_louvain', 'Optional',
+                          'annotations'],
+        'allowed-io': [],
+        'max-line-length': 120,
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,420 @@
+"""
+This module contains the stress and property tests comparing the fast, array based community detection paths
+against the reference implementation on Graph/WeightedGraph objects in classes.py and louvain.py.
+
+Random graphs are generated from fixed seeds. The reference implementation is only run on small graphs, and
+the fast paths are checked to give the same modularity, aggregation and partitions. The scaling tests check
+that the running time of the fast paths grows close to linearly with the number of edges.
+
+Run with: python -m pytest -q test_fast_paths.py
+
+Credit: Yoyo Liu, Manahill Sajid, Allyssa Chiu, Adya Veda Riddhi Revti Gopaul
+"""
+from __future__ import annotations
+import pickle
+import threading
+import time
+from typing import Callable
+import networkx as nx
+import numpy as np
+import pytest
+from classes import Graph, _Vertex
+from compact_graph import CompactGraph
+from compact_louvain import LouvainRun, aggregate, canonical_labels, louvain, modularity
+from graph_stats import degree_histogram, graph_summary, streaming_degrees, streaming_summary
+from helper_functions import get_weighted_graph
+from interop import from_networkx, from_sparse, to_networkx, to_sparse
+from io_pipeline import load_compact_graph, load_graph
+from label_propagation import label_propagation
+from louvain import graph_to_weighted_graph, louvain_algorithm
+from metrics import community_metrics, partition_summary
+from out_of_core import OutOfCoreGraph, out_of_core_louvain
+from overlapping import overlapping_communities
+from pre_processing import get_compact_graph, get_graph
+from subgraphs import recursive_louvain
+
+SEEDS = range(10)
+
+
+###################################################################################################
+# Random graphs
+###################################################################################################
+def random_edges(n: int, num_edges: int, seed: int) -> (np.ndarray, np.ndarray):
+    """Return the endpoints of num_edges random edges between n vertices, possibly repeated."""
+    rng = np.random.default_rng(seed)
+
+    return rng.integers(0, n, num_edges), rng.integers(0, n, num_edges)
+
+
+def planted_edges(num_groups: int, group_size: int, inside: float, outside: float,
+                  seed: int) -> (np.ndarray, np.ndarray):
+    """
+    Return the edges of a random graph with num_groups groups of group_size vertices, where two vertices are
+    adjacent with probability inside when they are in the same group and outside otherwise.
+    """
+    rng = np.random.default_rng(seed)
+    n = num_groups * group_size
+    src, dst = np.triu_indices(n, k=1)
+    same = src // group_size == dst // group_size
+    keep = rng.random(src.shape[0]) < np.where(same, inside, outside)
+
+    return src[keep], dst[keep]
+
+
+def reference_graph(n: int, src: np.ndarray, dst: np.ndarray) -> Graph:
+    """Return the Graph with vertices 0 to n - 1 and the given edges, leaving out self-loops."""
+    g = Graph()
+    for i in range(n):
+        g.add_vertex(i)
+    for u, v in zip(src.tolist(), dst.tolist()):
+        if u != v:
+            g.add_edge(u, v)
+
+    return g
+
+
+def compact_graph(n: int, src: np.ndarray, dst: np.ndarray) -> CompactGraph:
+    """Return the CompactGraph with the same vertices and edges as reference_graph(n, src, dst)."""
+    keep = src != dst
+    graph = CompactGraph(n, src[keep], dst[keep])
+
+    return CompactGraph(n, graph.src, graph.dst)
+
+
+def reference_partition(g: Graph, labels: np.ndarray) -> dict[_Vertex, int]:
+    """Return the partition of g where vertex i is in community labels[i], in the form used by classes.py."""
+    return {g.vertices[i]: label for i, label in enumerate(labels.tolist())}
+
+
+def reference_modularity(g: Graph, labels: np.ndarray) -> float:
+    """
+    Return the modularity of the partition labels of g, as computed by calculate_modularity_graph.
+
+    calculate_modularity_graph leaves out the terms of every vertex with itself, so its value is the usual
+    modularity plus the sum of (k_v / 2m) ** 2 over the vertices; that sum is taken off here.
+    """
+    q = g.calculate_modularity_graph(reference_partition(g, labels), g.make_adjacent_matrix())
+    m = g.get_total_weight()
+    strengths = np.array(list(g.get_strengths().values()), dtype=np.float64)
+
+    return q - float(np.sum((strengths / (2 * m)) ** 2)) if m > 0 else q
+
+
+def timed(function: Callable[[], object], repeats: int = 3) -> float:
+    """Return the shortest of repeats running times of function, in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+###################################################################################################
+# Modularity and aggregation
+###################################################################################################
+@pytest.mark.parametrize('seed', SEEDS)
+def test_modularity_matches_reference(seed: int) -> None:
+    """The compact modularity of a random partition is the reference modularity."""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 30))
+    src, dst = random_edges(n, int(rng.integers(1, 3 * n)), seed)
+    labels = rng.integers(0, int(rng.integers(1, n)), n)
+
+    expected = reference_modularity(reference_graph(n, src, dst), labels)
+    assert modularity(compact_graph(n, src, dst), labels) == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_modularity_matches_networkx(seed: int) -> None:
+    """The compact modularity matches networkx, with weights, self-loops and resolution."""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 40))
+    src, dst = random_edges(n, 4 * n, seed)
+    graph = CompactGraph(n, src, dst, rng.integers(1, 5, src.shape[0]), directed=seed % 2 == 1)
+    labels = canonical_labels(rng.integers(0, 4, n))
+    communities = [set(np.flatnonzero(labels == c).tolist()) for c in range(labels.max() + 1)]
+
+    expected = nx.community.modularity(to_networkx(graph), communities, resolution=0.7)
+    assert modularity(graph, labels, 0.7) == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_aggregate_matches_reference(seed: int) -> None:
+    """aggregate gives the same community graph as helper_functions.get_weighted_graph, with the same modularity."""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 25))
+    src, dst = random_edges(n, 3 * n, seed)
+    labels = canonical_labels(rng.integers(0, 5, n))
+    graph = compact_graph(n, src, dst)
+
+    reference = get_weighted_graph(graph_to_weighted_graph(reference_graph(n, src, dst)),
+                                   dict(enumerate(labels.tolist())))
+    coarse = aggregate(graph, labels)
+    loops = coarse.src == coarse.dst
+    assert {(u, v): w for u, v, w in zip(coarse.src[~loops].tolist(), coarse.dst[~loops].tolist(),
+                                         coarse.weights[~loops].tolist())} == \
+        {(min(u, v), max(u, v)): reference.get_weight(u, v)
+         for u in reference.vertices for v in reference.get_neighbours(u) if u < v}
+    inner = dict(zip(coarse.src[loops].tolist(), coarse.weights[loops].tolist()))
+    assert all(reference.vertices[c].inner_weight == 2 * inner.get(c, 0) for c in reference.vertices)
+
+    assert modularity(coarse, np.arange(coarse.num_vertices)) == pytest.approx(modularity(graph, labels))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_metrics_sum_to_modularity(seed: int) -> None:
+    """The per-community metrics add up to the whole-partition modularity and edge weight."""
+    rng = np.random.default_rng(seed)
+    src, dst = random_edges(50, 200, seed)
+    graph = CompactGraph(50, src, dst)
+    labels = canonical_labels(rng.integers(0, 6, 50))
+    table = community_metrics(graph, labels)
+
+    assert partition_summary(graph, table)['modularity'] == pytest.approx(modularity(graph, labels))
+    assert table['internal_weight'].sum() + table['cut'].sum() / 2 == pytest.approx(graph.total_weight)
+
+
+###################################################################################################
+# Partitions
+###################################################################################################
+@pytest.mark.parametrize('seed', SEEDS)
+def test_planted_partition_found_by_every_path(seed: int) -> None:
+    """
+    On graphs with clear communities, every fast path finds the planted groups, and every community found by
+    one pass of the reference algorithm lies inside a planted group.
+    """
+    num_groups, group_size = 4, 8
+    src, dst = planted_edges(num_groups, group_size, 0.9, 0.01, seed)
+    n = num_groups * group_size
+    planted = np.repeat(np.arange(num_groups), group_size)
+    graph = compact_graph(n, src, dst)
+
+    g = reference_graph(n, src, dst)
+    communities, _ = louvain_algorithm(g, g.make_adjacent_matrix())
+    reference = np.array([communities[g.vertices[i]] for i in range(n)])
+    assert all(np.unique(planted[reference == c]).shape[0] == 1 for c in np.unique(reference))
+
+    levels, _ = louvain(graph)
+    assert levels[-1].tolist() == planted.tolist()
+    assert label_propagation(graph).tolist() == planted.tolist()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_louvain_not_worse_than_reference(seed: int) -> None:
+    """The compact Louvain partition is at least as good as one pass of the reference algorithm."""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(10, 30))
+    src, dst = random_edges(n, 2 * n, seed)
+    graph = compact_graph(n, src, dst)
+
+    g = reference_graph(n, src, dst)
+    communities, _ = louvain_algorithm(g, g.make_adjacent_matrix())
+    reference = np.array([communities[g.vertices[i]] for i in range(n)])
+
+    _, q = louvain(graph)
+    assert q >= modularity(graph, reference) - 1e-12
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_louvain_levels_improve_modularity(seed: int) -> None:
+    """Every Louvain level has a modularity at least that of the previous one, and the result is reproducible."""
+    src, dst = random_edges(300, 1500, seed)
+    graph = CompactGraph(300, src, dst, directed=seed % 2 == 1)
+    levels, q = louvain(graph)
+
+    qualities = [modularity(graph, np.arange(300))] + [modularity(graph, level) for level in levels]
+    assert all(after >= before - 1e-12 for before, after in zip(qualities, qualities[1:]))
+    assert q == pytest.approx(qualities[-1])
+    assert all(level.tolist() == canonical_labels(level).tolist() for level in levels)
+    assert [level.tolist() for level in louvain(graph)[0]] == [level.tolist() for level in levels]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_anytime_run_resumes_to_same_result(seed: int) -> None:
+    """A LouvainRun stopped after every sweep and pickled in between ends with the partition of louvain."""
+    src, dst = random_edges(200, 800, seed)
+    graph = CompactGraph(200, src, dst)
+    levels, q = louvain(graph)
+
+    run = LouvainRun(graph)
+    timed_out = True
+    while timed_out:
+        labels, best_q, timed_out = run.run(time_budget=1e-3)
+        assert best_q == pytest.approx(modularity(graph, labels))
+        run = pickle.loads(pickle.dumps(run))
+
+    assert labels.tolist() == levels[-1].tolist() and best_q == pytest.approx(q)
+
+
+def test_out_of_core_matches_its_modularity(tmp_path) -> None:
+    """The out-of-core Louvain reports the modularity of its partition and is close to the in-memory one."""
+    src, dst = planted_edges(10, 30, 0.3, 0.01, 0)
+    edges = tmp_path / 'edges.txt'
+    np.savetxt(edges, np.column_stack((src, dst)), fmt='%d', delimiter=',')
+    graph = OutOfCoreGraph(np.arange(300), str(edges), str(tmp_path / 'arrays'), chunk_size=100)
+    levels, q = out_of_core_louvain(graph, block_edges=500, chunk_size=100)
+
+    compact = CompactGraph(300, src, dst)
+    assert q == pytest.approx(modularity(compact, levels[-1]))
+    assert q == pytest.approx(louvain(compact)[1], abs=0.02)
+
+
+def test_recursive_louvain_independent_of_workers() -> None:
+    """The sub-community hierarchy is the same in this process and in a worker pool."""
+    src, dst = planted_edges(6, 20, 0.5, 0.02, 1)
+    graph = CompactGraph(120, src, dst)
+    start = np.repeat(np.arange(2), 60)
+
+    in_process = recursive_louvain(graph, start, min_size=10, max_depth=2, workers=1)
+    in_pool = recursive_louvain(graph, start, min_size=10, max_depth=2, workers=2)
+    assert [level.tolist() for level in in_process] == [level.tolist() for level in in_pool]
+
+
+def test_overlapping_communities_independent_of_workers() -> None:
+    """The overlapping communities are the same in this process and in a worker pool, and cover every vertex."""
+    src, dst = planted_edges(6, 20, 0.6, 0.01, 1)
+    graph = CompactGraph(120, src, dst)
+
+    in_process = overlapping_communities(graph, workers=1)
+    in_pool = overlapping_communities(graph, workers=2)
+    assert (in_process != in_pool).nnz == 0
+    assert np.all(in_process.sum(axis=1) > 0)
+
+
+###################################################################################################
+# Loaders, statistics and conversions
+###################################################################################################
+def test_loaders_agree() -> None:
+    """The threaded loader gives the same graph and names as pre_processing, for any batch size."""
+    graph, names = get_compact_graph('fb-pages-food-nodes.txt', 'fb-pages-food-edges.txt')
+    for batch_size in (7, 1000):
+        other, other_names = load_compact_graph('fb-pages-food-nodes.txt', 'fb-pages-food-edges.txt',
+                                                batch_size=batch_size)
+        assert other_names == names
+        assert other.items.tolist() == graph.items.tolist()
+        assert other.src.tolist() == graph.src.tolist() and other.dst.tolist() == graph.dst.tolist()
+
+
+@pytest.mark.parametrize('loader', [load_compact_graph, load_graph])
+def test_loader_threads_stop_on_error(tmp_path, loader: Callable) -> None:
+    """A vertices file that cannot be parsed raises its error without leaving a reader thread behind."""
+    vertices = tmp_path / 'nodes.txt'
+    vertices.write_text('1,ok,5\nno id on this line\n')
+    threads = threading.active_count()
+
+    with pytest.raises(IndexError):
+        loader(str(vertices), 'fb-pages-food-edges.txt', batch_size=1, max_batches=1)
+    assert threading.active_count() == threads
+
+
+def test_object_and_compact_loaders_agree() -> None:
+    """get_graph and get_compact_graph build the same graph from the food data, with the same modularity."""
+    g, names = get_graph('fb-pages-food-nodes.txt', 'fb-pages-food-edges.txt')
+    graph, compact_names = get_compact_graph('fb-pages-food-nodes.txt', 'fb-pages-food-edges.txt')
+    items = graph.items.tolist()
+
+    assert compact_names == names and items == list(g.vertices)
+    assert graph.total_weight == g.get_total_weight() == g.get_num_edges()
+    assert graph.out_strength.tolist() == [g.get_strengths()[g.vertices[item]] for item in items]
+    compact_edges = zip(graph.items[graph.src].tolist(), graph.items[graph.dst].tolist())
+    assert sorted((min(u, v), max(u, v)) for u, v in compact_edges) == \
+        sorted((min(u.item, v.item), max(u.item, v.item)) for u, v, _ in g._edges())
+
+    # vertex i of graph is items[i], so the reference partition is keyed by item
+    labels = np.arange(graph.num_vertices) // 20
+    partition = {g.vertices[item]: label for item, label in zip(items, labels.tolist())}
+    offset = sum((strength / (2 * graph.total_weight)) ** 2 for strength in g.get_strengths().values())
+    assert modularity(graph, labels) == pytest.approx(
+        g.calculate_modularity_graph(partition, g.make_adjacent_matrix()) - offset)
+
+    # keeping the self-loops only adds them, each once
+    with_loops, _ = get_compact_graph('fb-pages-food-nodes.txt', 'fb-pages-food-edges.txt', self_loops='keep')
+    is_loop = with_loops.src == with_loops.dst
+    assert with_loops.num_edges == graph.num_edges + int(is_loop.sum()) and is_loop.any()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_statistics_match_networkx(seed: int) -> None:
+    """graph_summary gives the values networkx computes on the converted graph."""
+    src, dst = random_edges(60, 150, seed)
+    graph = CompactGraph(60, src, dst)
+    graph_nx = to_networkx(graph)
+    graph_nx.remove_edges_from(nx.selfloop_edges(graph_nx))
+    summary = graph_summary(graph)
+
+    assert summary['edges'] == graph_nx.number_of_edges()
+    assert summary['components'] == nx.number_connected_components(graph_nx)
+    assert summary['density'] == pytest.approx(nx.density(graph_nx))
+    assert summary['transitivity'] == pytest.approx(nx.transitivity(graph_nx))
+    assert summary['average_clustering'] == pytest.approx(nx.average_clustering(graph_nx))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_streaming_summary_matches_graph_summary(tmp_path, seed: int) -> None:
+    """The out-of-core statistics, read a few edges at a time, match graph_summary on the same edges."""
+    src, dst = random_edges(60, 150, seed)
+    edges = tmp_path / 'edges.txt'
+    edges.write_text(''.join(f'{u},{v}\n' for u, v in zip(src.tolist(), dst.tolist())))
+    directed = seed % 2 == 1
+    graph = OutOfCoreGraph(np.arange(60), str(edges), str(tmp_path / 'arrays'), directed=directed,
+                           self_loops='keep', chunk_size=16)
+    summary = graph_summary(CompactGraph(60, src, dst, directed=directed))
+
+    streamed = streaming_summary(graph, chunk_size=16)
+    assert streamed == {key: summary[key] for key in streamed}
+    assert np.bincount(streaming_degrees(graph, chunk_size=16)).tolist() == \
+        degree_histogram(CompactGraph(60, src, dst, directed=directed)).tolist()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_conversions_round_trip(seed: int) -> None:
+    """Converting to networkx or SciPy and back gives the same edges and weights."""
+    rng = np.random.default_rng(seed)
+    src, dst = random_edges(40, 120, seed)
+    graph = CompactGraph(40, src, dst, rng.integers(1, 9, 120), directed=seed % 2 == 1)
+
+    for other in (from_networkx(to_networkx(graph)), from_sparse(to_sparse(graph), graph.directed)):
+        order = np.argsort(other.items, kind='stable')
+        relabel = np.empty(40, dtype=np.int64)
+        relabel[order] = np.arange(40)
+        assert sorted(zip(relabel[other.src].tolist(), relabel[other.dst].tolist(), other.weights.tolist())) == \
+            sorted(zip(graph.src.tolist(), graph.dst.tolist(), graph.weights.tolist()))
+
+
+###################################################################################################
+# Scaling
+###################################################################################################
+SCALING_SIZES = (50_000, 200_000)
+# the larger graph has 4 times the edges, so a linear algorithm takes about 4 times as long and a quadratic one
+# 16 times; the margin above 4 allows for timing noise and cache effects
+MAX_TIME_RATIO = 8
+
+
+def scaling_graph(num_edges: int) -> CompactGraph:
+    """Return a random graph with num_edges edges and planted communities of about 50 vertices."""
+    rng = np.random.default_rng(0)
+    n = num_edges // 5
+    src = rng.integers(0, n, num_edges)
+    # most edges stay within the block of 50 vertices of their source
+    dst = np.where(rng.random(num_edges) < 0.8, src // 50 * 50 + rng.integers(0, 50, num_edges),
+                   rng.integers(0, n, num_edges)) % n
+
+    return CompactGraph(n, src, dst)
+
+
+@pytest.mark.parametrize('name, function', [
+    ('modularity', lambda graph: modularity(graph, np.arange(graph.num_vertices) // 50)),
+    ('label_propagation', label_propagation),
+    # every wedge is checked on both graphs, rather than all of them on one graph and a sample on the other
+    ('graph_summary', lambda graph: graph_summary(graph, max_wedges=10 ** 8)),
+    ('louvain', louvain),
+])
+def test_near_linear_scaling(name: str, function: Callable[[CompactGraph], object]) -> None:
+    """The running time grows close to linearly with the number of edges."""
+    small, large = (scaling_graph(size) for size in SCALING_SIZES)
+    repeats = 1 if name == 'louvain' else 3
+
+    ratio = timed(lambda: function(large), repeats) / timed(lambda: function(small), repeats)
+    assert ratio < MAX_TIME_RATIO, name